@@ -0,0 +1,62 @@
+# 📁 benchmarks/page_import_benchmark.py
+# 统计每个页面模块的 import 耗时（启动成本）：
+#   - 每次测量都在新的 Python 进程中进行，避免模块已被缓存
+#   - 先 import streamlit / pandas / numpy 作为公共基线（每个页面都需要），只统计页面本身额外的耗时
+#   - 最后一行“全部页面”对应原来 app.py 启动时一次性 import 所有页面的成本
+# 用法（在 System 目录下运行）：
+#   python benchmarks/page_import_benchmark.py --repeat 5
+import argparse
+import os
+import subprocess
+import sys
+
+SYSTEM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SYSTEM_DIR)
+
+from ui.page_registry import PAGES  # noqa: E402
+
+BASELINE_IMPORTS = "import streamlit, pandas, numpy"
+
+# 在子进程中执行：先加载公共基线，再计时 import 指定模块
+MEASURE_SCRIPT = """
+import importlib, sys, time
+{baseline}
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(time.perf_counter() - start)
+"""
+
+
+def import_seconds(module_names, baseline=BASELINE_IMPORTS):
+    """在新进程中 import module_names，返回耗时（秒，不含公共基线）"""
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT.format(baseline=baseline), *module_names],
+        cwd=SYSTEM_DIR, capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def best_of(module_names, repeat, baseline=BASELINE_IMPORTS):
+    """重复测量，取最快一次的耗时（毫秒）"""
+    return min(import_seconds(module_names, baseline) for _ in range(repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="各页面模块的 import 耗时")
+    parser.add_argument('--repeat', type=int, default=3, help="每个页面重复测量次数（取最快一次）")
+    args = parser.parse_args()
+
+    baseline_ms = best_of(BASELINE_IMPORTS.replace("import ", "").split(", "), args.repeat, baseline="")
+    print(f"公共基线（{BASELINE_IMPORTS}）：{baseline_ms:.0f} ms")
+    print()
+    print(f"{'页面':<24}{'模块':<34}{'import(ms)':>12}")
+    for page, (module_name, _) in PAGES.items():
+        print(f"{page:<24}{module_name:<34}{best_of([module_name], args.repeat):>12.0f}")
+
+    all_modules = [module_name for module_name, _ in PAGES.values()]
+    print(f"{'全部页面（原 app.py 启动）':<24}{'':<34}{best_of(all_modules, args.repeat):>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
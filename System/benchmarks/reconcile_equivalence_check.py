@@ -0,0 +1,68 @@
+# 📁 benchmarks/reconcile_equivalence_check.py
+# 校验 modules/reconcile.py 中向量化的 reconcile_month_start 与逐行的 calculate_reconcile_date 结果一致：
+#   - 日期覆盖每年 12 月 ~ 次年 1 月的每一天（跨年），以及 2 月底（含闰年 2 月 29 日）
+#   - 截止日取 1 / 15 / 25 / 28 / 31，并混入 NaT
+#   - 分别以 Series 和 numpy 数组传入向量化版本
+# 不一致时列出前几条差异并以非 0 状态退出。
+# 用法（在 System 目录下运行）：
+#   python benchmarks/reconcile_equivalence_check.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.reconcile import calculate_reconcile_date, reconcile_month_start  # noqa: E402
+
+CUTOFF_DAYS = [1, 15, 25, 28, 31]
+YEARS = [2022, 2023, 2024, 2025]
+
+
+def sample_dates():
+    """每年 12 月 1 日 ~ 次年 1 月 31 日、2 月 20 日 ~ 3 月 5 日的每一天，中间穿插 NaT"""
+    ranges = []
+    for year in YEARS:
+        ranges.append(pd.date_range(f"{year}-12-01", f"{year + 1}-01-31", freq='D'))
+        ranges.append(pd.date_range(f"{year}-02-20", f"{year}-03-05", freq='D'))
+    dates = np.concatenate([r.to_numpy() for r in ranges]).astype('datetime64[ns]')
+    # 每隔 7 天插入一个 NaT
+    dates = np.insert(dates, np.arange(0, len(dates), 7), np.datetime64('NaT'))
+    return pd.Series(dates)
+
+
+def compare(dates, cutoff_day):
+    """返回 (检查的日期数, 不一致的行)"""
+    expected = pd.Series([calculate_reconcile_date(d, cutoff_day) for d in dates], dtype='datetime64[ns]')
+    from_series = reconcile_month_start(dates, cutoff_day)
+    from_array = pd.Series(reconcile_month_start(dates.to_numpy(), cutoff_day))
+
+    mismatched = ~(
+        (expected.eq(from_series) | (expected.isna() & from_series.isna()))
+        & (expected.eq(from_array) | (expected.isna() & from_array.isna()))
+    )
+    diff = pd.DataFrame({
+        '过账日期': dates, '截止日': cutoff_day,
+        '逐行版本': expected, '向量化(Series)': from_series, '向量化(数组)': from_array,
+    })[mismatched.to_numpy()]
+    return len(dates), diff
+
+
+def main():
+    dates = sample_dates()
+    failures = []
+    for cutoff_day in CUTOFF_DAYS:
+        checked, diff = compare(dates, cutoff_day)
+        print(f"截止日 {cutoff_day:>2}：检查 {checked} 个日期（含 {dates.isna().sum()} 个 NaT），不一致 {len(diff)} 个")
+        failures.append(diff)
+
+    failures = pd.concat(failures, ignore_index=True)
+    if len(failures):
+        print(failures.head(20).to_string())
+        sys.exit(1)
+    print("✅ 向量化版本与逐行版本结果一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# 📁 benchmarks/schema_groupby_benchmark.py
+# 对比供应商数据在“原来的类型”（object 字符串）与 modules/schema.py 声明的类型下，
+# 常用 groupby / 筛选操作的耗时和内存占用。
+# 用法（在 System 目录下运行）：
+#   python benchmarks/schema_groupby_benchmark.py --rows 500000
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.schema import SUPPLIER_SCHEMA, apply_schema, memory_footprint_mb  # noqa: E402
+
+
+def make_supplier_frame(rows, seed=0):
+    """生成与供应商表结构相同的模拟数据（原来的类型：号码、公司名称、部门均为 object 字符串）"""
+    rng = np.random.default_rng(seed)
+    departments = np.array(['蔬菜', '水果', '肉类', '海鲜', '杂货', '冻货', '面包', '酒水', '日用品', '熟食'])
+    companies = np.array([f'Supplier {i}' for i in range(800)])
+    invoice_dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 900, rows), unit='D')
+    cheques = rng.integers(1, rows // 3 + 2, rows).astype(str).astype(object)
+    cheques[rng.random(rows) < 0.2] = 'nan'
+    amounts = rng.uniform(10, 5000, rows).round(2)
+
+    return pd.DataFrame({
+        '公司名称': companies[rng.integers(0, len(companies), rows)].astype(object),
+        '部门': departments[rng.integers(0, len(departments), rows)].astype(object),
+        '发票号': np.char.add('IN', np.arange(rows).astype(str)).astype(object),
+        '发票日期': invoice_dates,
+        '发票金额': amounts,
+        'TPS': (amounts * 0.05).round(2),
+        'TVQ': (amounts * 0.09975).round(2),
+        '付款支票号': cheques,
+        '实际支付金额': amounts,
+        '付款支票总额': amounts,
+        '开支票日期': invoice_dates + pd.Timedelta(days=10),
+        '银行对账日期': invoice_dates + pd.Timedelta(days=20),
+    })
+
+
+OPERATIONS = {
+    '按部门汇总': lambda df: df.groupby('部门', observed=True)[['发票金额', '实际支付金额']].sum(),
+    '按部门 + 公司汇总': lambda df: df.groupby(['部门', '公司名称'], observed=True)['发票金额'].sum(),
+    '按支票号汇总': lambda df: df.groupby('付款支票号', observed=True)['实际支付金额'].sum(),
+    '公司名称筛选': lambda df: df[df['公司名称'] == 'Supplier 42'],
+    '部门 isin 筛选': lambda df: df[df['部门'].isin(['蔬菜', '水果'])],
+}
+
+
+def best_of(func, df, repeat):
+    """重复执行，取最快一次的耗时（毫秒）"""
+    return min(timeit.repeat(lambda: func(df), number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="供应商数据 schema 前后 groupby 性能对比")
+    parser.add_argument('--rows', type=int, default=200_000, help="模拟数据行数")
+    parser.add_argument('--repeat', type=int, default=5, help="每个操作重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    before = make_supplier_frame(args.rows)
+    after = apply_schema(before.copy(), SUPPLIER_SCHEMA)
+
+    print(f"行数：{args.rows:,}")
+    print(f"内存占用：原来 {memory_footprint_mb(before)} MB → schema 后 {memory_footprint_mb(after)} MB")
+    print()
+    print(f"{'操作':<16}{'原来(ms)':>12}{'schema后(ms)':>14}{'加速':>8}")
+    for name, func in OPERATIONS.items():
+        t_before = best_of(func, before, args.repeat)
+        t_after = best_of(func, after, args.repeat)
+        print(f"{name:<16}{t_before:>12.1f}{t_after:>14.1f}{t_before / t_after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
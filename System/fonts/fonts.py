@@ -1,11 +1,19 @@
 # System/fonts/fonts.py
+# 中文字体（matplotlib 画图用）：
+#   - 字体路径相对于本文件所在目录，不依赖程序启动时的工作目录
+#   - 只有真正需要画 matplotlib 图时才 import matplotlib 并创建 FontProperties，
+#     结果在进程内缓存，之后各页面重复调用直接返回同一个对象
 import os
-from matplotlib import font_manager
+from functools import lru_cache
 
-def load_chinese_font():
-    font_path = os.path.join("System", "fonts", "SimHei.ttf")  # 确保路径和文件名正确
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SimHei.ttf")
+
+
+@lru_cache(maxsize=None)
+def load_chinese_font(font_path=FONT_PATH):
     if not os.path.exists(font_path):
         print("[错误] 中文字体文件未找到:", font_path)
         return None
-    return font_manager.FontProperties(fname=font_path)
 
+    from matplotlib import font_manager
+    return font_manager.FontProperties(fname=font_path)
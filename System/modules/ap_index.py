@@ -0,0 +1,88 @@
+# 📁 modules/ap_index.py
+# 应付账款（AP）累计索引：
+#   - 新增（发票）：按 发票日期 排序后的 发票金额 累计和
+#   - 清偿（付款）：按 银行对账日期 排序后的 实际支付金额 累计和
+# 两者都按部门分别保存。任意日期 D 的应付余额 = 新增累计(D) - 清偿累计(D)，
+# 每次查询只需两次二分查找（np.searchsorted），不再对整张表做筛选 + groupby。
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.money import cents_array
+
+# 汇总所有部门时使用的键
+ALL_DEPARTMENTS = '__全部__'
+
+
+def build_cumulative_index(dates, values, groups=None):
+    """
+    构建累计索引：{部门: (排序后的日期 int64 纳秒, 对应的累计金额)}，另含所有部门合计 ALL_DEPARTMENTS
+    - 金额单位为“分”，累计和为精确的 int64；日期为空（NaT）的行不进入索引；金额为空按 0 计算
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce').reset_index(drop=True)
+    valid = dates.notna().to_numpy()
+
+    date_ns = dates.to_numpy(dtype='datetime64[ns]')[valid].astype(np.int64)
+    amounts = cents_array(values)[valid]
+
+    def _cumulative(mask=None):
+        d = date_ns if mask is None else date_ns[mask]
+        a = amounts if mask is None else amounts[mask]
+        order = np.argsort(d, kind='stable')
+        return d[order], np.cumsum(a[order])
+
+    index = {ALL_DEPARTMENTS: _cumulative()}
+    if groups is not None:
+        group_values = pd.Series(groups).reset_index(drop=True).to_numpy()[valid]
+        for group in pd.unique(group_values):
+            if pd.isna(group):
+                continue
+            index[group] = _cumulative(group_values == group)
+    return index
+
+
+def cumulative_as_of(index, as_of_dates, departments=None):
+    """
+    查询累计金额（分）：日期 <= as_of_dates 的金额合计（可传入多个日期，返回 numpy 数组）
+    departments 为空时使用所有部门合计；查询日期为空（NaT）时结果为 NaN
+    """
+    query = pd.to_datetime(pd.Series(as_of_dates), errors='coerce')
+    query_ns = query.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+    keys = [ALL_DEPARTMENTS] if departments is None else [d for d in departments if d in index]
+    total = np.zeros(len(query_ns))
+    for key in keys:
+        sorted_dates, cumsum = index[key]
+        if len(cumsum) == 0:
+            continue
+        positions = np.searchsorted(sorted_dates, query_ns, side='right')
+        total += np.where(positions > 0, cumsum[np.maximum(positions - 1, 0)], 0.0)
+
+    total[query.isna().to_numpy()] = np.nan
+    return total
+
+
+def build_ap_index(df, clearance_date_col='银行对账日期'):
+    """
+    构建 AP 索引：新增 = 按 发票日期 累计的 发票金额；清偿 = 按 clearance_date_col 累计的 实际支付金额
+    - 会计口径：clearance_date_col='银行对账日期'（银行过账才算付款）
+    - 管理口径：clearance_date_col='发票日期'（付款归属到发票所在日期，与 ap_unpaid 图表一致）
+    """
+    return {
+        'additions': build_cumulative_index(df['发票日期'], df['发票金额'], df['部门']),
+        'clearances': build_cumulative_index(df[clearance_date_col], df['实际支付金额'], df['部门']),
+    }
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_ap_index(_df, version, clearance_date_col='银行对账日期'):
+    """按数据版本缓存的 AP 索引（缓存键为数据版本号 + 对账日期口径）"""
+    return build_ap_index(_df, clearance_date_col)
+
+
+def ap_as_of(ap_index, as_of_dates, departments=None):
+    """截至指定日期的应付未付余额 = 新增累计 - 清偿累计"""
+    return (
+        cumulative_as_of(ap_index['additions'], as_of_dates, departments)
+        - cumulative_as_of(ap_index['clearances'], as_of_dates, departments)
+    )
@@ -1,21 +1,23 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from itertools import cycle
 
 from ui.sidebar import get_selected_departments
-from modules.data_loader import load_supplier_data
+from modules.data_loader import load_supplier_data, data_version
+from modules.ap_index import load_ap_index, ap_as_of
+from modules.payment_rules import unpaid_amount
+from modules.time_cube import load_time_cube, cube_by_month, cube_by_week, weeks_overlapping_month, month_key_of, WEEK_KEY_COL
+from modules.table_builder import build_subtotal_table
+from modules.money import CENTS_PER_UNIT, from_cents, display_amounts
+from modules.chart_data import hover_fields, safe_ratio, year_month_label
+from modules.figure_budget import limit_series, with_other_color, point_labels, cached_figure
+from ui.table_style import highlight_summary_rows
 
 
 def style_dataframe(df):
-    def highlight_rows(row):
-        if isinstance(row['部门'], str):
-            if row['部门'].endswith("汇总"):
-                return ['background-color: #E8F6F3'] * len(row)
-            elif row['部门'] == '总计':
-                return ['background-color: #FADBD8'] * len(row)
-        return [''] * len(row)
-    return df.style.apply(highlight_rows, axis=1).format({
+    # 部门小计行（XX 汇总）浅绿色，总计行粉红色
+    # 金额以“分”保存，显示前换算为“元”
+    return highlight_summary_rows(display_amounts(df), '部门', subtotal_color='#E8F6F3', total_color='#FADBD8').format({
         '发票金额': "{:,.2f}",
         '实际支付金额': "{:,.2f}",
         '应付未付差额': "{:,.2f}"
@@ -37,14 +39,14 @@ def ap_unpaid_query():
     ].copy()
     filtered_time_only['实际支付金额'] = filtered_time_only['实际支付金额'].fillna(0)
     filtered_time_only['发票金额'] = filtered_time_only['发票金额'].fillna(0)
-    filtered_time_only['应付未付差额'] = filtered_time_only['发票金额'] - filtered_time_only['实际支付金额']
+    filtered_time_only['应付未付差额'] = unpaid_amount(filtered_time_only['发票金额'], filtered_time_only['实际支付金额'])
 
     # ✅ 柱状图：筛选部门
     filtered = filtered_time_only[filtered_time_only['部门'].isin(departments)].copy()
 
     # ✅ 部门汇总表
     summary_table = (
-        filtered.groupby('部门')[['发票金额', '实际支付金额', '应付未付差额']]
+        filtered.groupby('部门', observed=True)[['发票金额', '实际支付金额', '应付未付差额']]
         .sum()
         .reset_index()
     )
@@ -75,30 +77,15 @@ def ap_unpaid_query():
     df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce').dt.date
 
     # 步骤 2：构建最终展示用的 DataFrame（明细 + 小计 + 总计）
-    final = pd.DataFrame()  # 初始化空表格用于后续拼接
-
-    # 遍历每个部门，分组处理
-    for dept, df_dept in filtered.groupby('部门'):
-        # 对每个部门内的公司分组
-        for company, df_comp in df_dept.groupby('公司名称'):
-            # 拼接当前公司所有明细数据，只保留指定列
-            final = pd.concat([final, df_comp[['部门', '公司名称', '发票号', '发票日期', '发票金额', '实际支付金额', '应付未付差额']]])
-        
-        # 部门小计：对当前部门的金额字段求和（总额、小计）
-        subtotal = df_dept[['发票金额', '实际支付金额', '应付未付差额']].sum().to_frame().T  # 转置成一行 DataFrame
-        subtotal['部门'] = f"{dept} 汇总"   # 特殊标识该行为“XX部门 汇总”
-        subtotal['公司名称'] = ''           # 小计行无公司
-        subtotal['发票号'] = ''             # 小计行无发票号
-        subtotal['发票日期'] = pd.NaT       # 小计行不设日期，用 pd.NaT 保持类型一致
-        final = pd.concat([final, subtotal], ignore_index=True)  # 拼接至 final 表格
-
-    # 所有部门总计：汇总所有金额字段
-    total = filtered[['发票金额', '实际支付金额', '应付未付差额']].sum().to_frame().T
-    total['部门'] = '总计'            # 标记“总计”行
-    total['公司名称'] = ''
-    total['发票号'] = ''
-    total['发票日期'] = pd.NaT        # 同样用 NaT 表示“无日期”
-    final = pd.concat([final, total], ignore_index=True)
+    # 明细按 部门 → 公司名称 排列；每个部门后插入“XX 汇总”小计行，最后追加“总计”行（小计/总计行不设日期，用 pd.NaT 保持类型一致）
+    final = build_subtotal_table(
+        filtered,
+        group_col='部门',
+        sum_cols=['发票金额', '实际支付金额', '应付未付差额'],
+        columns=['部门', '公司名称', '发票号', '发票日期', '发票金额', '实际支付金额', '应付未付差额'],
+        sort_cols=['部门', '公司名称'],
+        fill={'公司名称': '', '发票号': '', '发票日期': pd.NaT},
+    )
 
     # 步骤 3：格式化“发票日期”为字符串（yyyy-mm-dd）
     # 必须使用 pd.notnull(d) 来过滤掉 NaT，否则调用 d.strftime 会报错
@@ -126,8 +113,6 @@ def ap_unpaid_query():
 
     import plotly.express as px
 
-    from datetime import timedelta
-
     # 1. 读取数据
     df_unpaid_zhexiantu = load_supplier_data()
 
@@ -139,55 +124,35 @@ def ap_unpaid_query():
         #df_unpaid_zhexiantu['付款支票号'].apply(lambda x: str(x).strip().lower() in ['', 'nan', 'none'])
     #]
 
-    # 将发票金额和实际支付金额转换为数值，处理非数值和空值
-    df_unpaid_zhexiantu['发票金额'] = pd.to_numeric(df_unpaid_zhexiantu['发票金额'], errors='coerce').fillna(0)
-    df_unpaid_zhexiantu['实际支付金额'] = pd.to_numeric(df_unpaid_zhexiantu['实际支付金额'], errors='coerce').fillna(0)
-
-    # 计算实际差额（未付款金额）
-    df_unpaid_zhexiantu['实际差额'] = df_unpaid_zhexiantu['发票金额'] - df_unpaid_zhexiantu['实际支付金额']
-
     # 处理发票日期，转换为 datetime 格式
     df_unpaid_zhexiantu['发票日期'] = pd.to_datetime(df_unpaid_zhexiantu['发票日期'], errors='coerce')
-    #df_unpaid_zhexiantu = df_unpaid_zhexiantu.dropna(subset=['发票日期', '实际差额'])
 
-    # 3. 去重（基于发票号、发票日期、实际差额）
-    #df_unpaid_zhexiantu = df_unpaid_zhexiantu.drop_duplicates(subset=['发票号', '发票日期', '实际差额'])
+    # ✅ 按 发票日期 分桶的汇总表（部门 × 月份 × 周，每个数据版本只计算一次）：
+    #    实际差额（未付款金额）= 发票金额 - 实际支付金额，空值按 0 计算；下面的月度 / 周度图表都只对它切片
+    ap_cube = load_time_cube(df_unpaid_zhexiantu, data_version(df_unpaid_zhexiantu), '发票日期')
 
-    # 4. 按月份分配（用于月度分析和周度过滤）
-    df_unpaid_zhexiantu['月份'] = df_unpaid_zhexiantu['发票日期'].dt.to_period('M').astype(str)
+    # ✅ 累计未付金额索引（按数据版本缓存）：付款归属到发票日期（与本页图表口径一致），
+    #    任意日期的累计未付金额 = 新增累计 - 付款累计，只需两次二分查找
+    ap_index = load_ap_index(df_unpaid_zhexiantu, data_version(df_unpaid_zhexiantu), clearance_date_col='发票日期')
 
     # 5. 按部门和月份汇总未付款金额
-    unpaid_summary = df_unpaid_zhexiantu.groupby(['部门', '月份'])['实际差额'].sum().reset_index()
+    # - 汇总在“分”上精确完成，画图前换算为“元”（下面的各个字典同样换算为元）
+    unpaid_summary = cube_by_month(ap_cube, ['实际差额'])[['部门', '月份', '实际差额']]
+    unpaid_summary['实际差额'] = from_cents(unpaid_summary['实际差额'])
 
-    # 6. 计算月度总未付款金额
-    monthly_totals = df_unpaid_zhexiantu.groupby('月份')['实际差额'].sum().reset_index()
-    monthly_totals_dict = monthly_totals.set_index('月份')['实际差额'].to_dict()
+    # 6. 每月所有部门的合计：【月份 → 总未付款金额】和【月份 → 发票总金额】
+    # - 这是为 hover 提示准备的数据，to_dict() 让你能通过 .get('2024-04') 快速访问某月的合计
+    monthly_totals = cube_by_month(ap_cube, ['实际差额', '发票金额'], by_department=False).set_index('月份')
+    monthly_totals_dict = from_cents(monthly_totals['实际差额']).to_dict()
+    monthly_invoice_totals_dict = from_cents(monthly_totals['发票金额']).to_dict()
 
     # 7. 生成部门颜色映射
     unique_departments = sorted(unpaid_summary['部门'].unique())
     colors = px.colors.qualitative.Dark24
-    color_map = {dept: colors[i % len(colors)] for i, dept in enumerate(unique_departments)}
-
-    # 8. 计算各部门每月的未付款金额汇总
-    
-    # 8.1 汇总每个部门在每个月的未付款金额（实际差额）
-    # - df_unpaid_zhexiantu 是一张原始表，包含未付款数据（按发票记录行）
-    # - groupby(['部门', '月份']) 后按部门和月份分组，统计每组的未付款总额
-    # - reset_index() 是为了将分组后的结果还原成普通表格（DataFrame）
-    unpaid_summary = df_unpaid_zhexiantu.groupby(['部门', '月份'])['实际差额'].sum().reset_index()
-
-
-    # 8.2 构建一个【月份 → 总未付款金额】的字典
-    # - 这是为 hover 提示准备的数据
-    # - 通过 groupby('月份') 对原始表按月份统计“所有部门”的未付总额
-    # - to_dict() 让你能通过 .get('2024-04') 快速访问某月的总未付金额
-    monthly_totals_dict = df_unpaid_zhexiantu.groupby('月份')['实际差额'].sum().to_dict()
-
+    color_map = with_other_color({dept: colors[i % len(colors)] for i, dept in enumerate(unique_departments)})
 
-    # 8.3 构建一个【月份 → 发票总金额】的字典
-    # - 和上面类似，不过这里是“总发票金额”，不是未付款金额
-    # - 之后将用于计算“未付款占发票比例”或显示提示用
-    monthly_invoice_totals_dict = df_unpaid_zhexiantu.groupby('月份')['发票金额'].sum().to_dict()
+    # 7.1 部门过多时金额较小的部门合并为“其他”（见 modules/figure_budget.py）
+    unpaid_summary = limit_series(unpaid_summary, ['实际差额'], x_cols=['月份'])
 
 
     # 8.4 把每行所对应的“总发票金额”和“总未付款金额”映射进 summary 表中
@@ -203,117 +168,80 @@ def ap_unpaid_query():
     
     # 9.1 ✅ 步骤一：先构建一个【月份 → 累计未付金额】的字典
     # 将“月份”列中的所有唯一值提取出来并排序（升序，如：['2023-11', '2023-12', '2024-01', '2024-02', ...]）
-    # 目的是确保计算累计金额时是按时间顺序进行的
-    sorted_months = sorted(df_unpaid_zhexiantu['月份'].unique())
+    sorted_months = monthly_totals.index.tolist()
 
-    # 初始化一个空字典，用来存储每个月份对应的“截止当月为止的累计未付款金额”
-    cumulative_unpaid_dict = {}
-
-    # 初始化累计和，从0开始
-    cumulative_sum = 0
-
-    # 遍历每一个月份
-    for month in sorted_months:
-        # 获取该月的未付总额（实际差额总和），从 monthly_totals_dict 中读取
-        # 如果该月没有记录，则默认为 0（使用 .get(month, 0)）
-        # 如果 month='2024-03'：monthly_totals_dict.get('2024-03', 0) 会得到 800
-        #如果某个月没有数据（例如 '2024-05' 没记录），会返回默认值 0
-        current_month_sum = monthly_totals_dict.get(month, 0)
-
-        # 将该月的未付金额累加到总和中
-        cumulative_sum += current_month_sum
-
-        # 把当前累计值记录到 cumulative_unpaid_dict 中，对应当前月份
-        cumulative_unpaid_dict[month] = cumulative_sum
+    # 每个月的累计未付金额 = 截止到该月最后一天的累计值，直接从 AP 累计索引中二分查找得到
+    month_ends = pd.to_datetime(pd.Series(sorted_months), format='%Y-%m', errors='coerce') + pd.offsets.MonthEnd(0)
+    cumulative_unpaid_dict = dict(zip(sorted_months, ap_as_of(ap_index, month_ends) / CENTS_PER_UNIT))
 
     # 9.2 ✅ 步骤二：将累计值映射到 unpaid_summary 表中
     unpaid_summary['累计未付金额'] = unpaid_summary['月份'].map(cumulative_unpaid_dict)
 
 
 
-    # 8.5 添加提示信息（HTML格式，用于hover）
-    unpaid_summary['提示信息'] = unpaid_summary.apply(
-        lambda row: 
-                    f"🔹截止到{row['月份'][:4]}年{row['月份'][5:]}月 <br>"
-                    f"累计未付金额：{row['累计未付金额']:,.0f}<br>"
-                    #f"当月未付金额：{monthly_totals_dict.get(row['月份'], 0):,.0f}<br>"
-                    f"当月未付金额：{row['总未付金额']:,.0f}<br>"
-                    f"当月 新增发票总金额：{monthly_invoice_totals_dict.get(row['月份'], 0):,.0f}<br>"
-                    f"<br>"
-                    f"部门：{row['部门']}<br>"
-                    f"当月未付金额：{row['实际差额']:,.0f}<br>"
-                    f"占比：{row['实际差额'] / monthly_invoice_totals_dict.get(row['月份'], 1):.1%}",
-        axis=1
+    # 8.5 添加 hover 提示信息
+    # - hover 只发送原始数字，由 Plotly 按模板格式化（见 modules/chart_data.py）
+    unpaid_summary['年月'] = year_month_label(unpaid_summary['月份'])
+    unpaid_summary['占比'] = safe_ratio(unpaid_summary['实际差额'], unpaid_summary['总发票金额'])
+    month_hover_cols, month_hover = hover_fields(
+        "🔹截止到{年月} <br>"
+        "累计未付金额：{累计未付金额:,.0f}<br>"
+        "当月未付金额：{总未付金额:,.0f}<br>"
+        "当月 新增发票总金额：{总发票金额:,.0f}<br>"
+        "<br>"
+        "部门：{部门}<br>"
+        "当月未付金额：{实际差额:,.0f}<br>"
+        "占比：{占比:.1%}"
     )
 
 
 
     # 9. 绘制月度折线图
-    fig_month = px.line(
-        unpaid_summary,
-        x="月份",
-        y="实际差额",
-        color="部门",
-        title="各部门每月未付账金额",
-        markers=True,
-        labels={"实际差额": "未付账金额", "月份": "月份"},
-        line_shape="linear",
-        color_discrete_map=color_map,
-        hover_data={'提示信息': True}
-    )
-
-    fig_month.update_traces(
-        text=unpaid_summary["实际差额"].round(0).astype(int),
-        textposition="top center",
-        hovertemplate="%{customdata[0]}"
-    )
+    # - 每个点的金额标签只在点数不多时显示；图表 JSON 按数据版本缓存
+    def build_month_figure():
+        fig = px.line(
+            unpaid_summary,
+            x="月份",
+            y="实际差额",
+            color="部门",
+            title="各部门每月未付账金额",
+            markers=True,
+            labels={"实际差额": "未付账金额", "月份": "月份"},
+            line_shape="linear",
+            color_discrete_map=color_map,
+            custom_data=month_hover_cols,
+            text=point_labels(unpaid_summary["实际差额"])
+        )
+        fig.update_traces(
+            textposition="top center",
+            hovertemplate=month_hover
+        )
+        return fig
+
+    fig_month = cached_figure("unpaid_month", (data_version(df_unpaid_zhexiantu),), build_month_figure)
 
     # 10. 显示月度图表
     #st.title("📊 各部门每月未付账金额分析")
     st.plotly_chart(fig_month, key="monthly_unpaid_chart001")
 
-    # 11. 周度分析
-    # 添加周范围（周一到周日）
-    df_unpaid_zhexiantu['周开始'] = df_unpaid_zhexiantu['发票日期'] - pd.to_timedelta(df_unpaid_zhexiantu['发票日期'].dt.weekday, unit='D')
-    df_unpaid_zhexiantu['周结束'] = df_unpaid_zhexiantu['周开始'] + timedelta(days=6)
-    df_unpaid_zhexiantu['周范围'] = df_unpaid_zhexiantu['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + df_unpaid_zhexiantu['周结束'].dt.strftime('%Y-%m-%d')
-
+    # 11. 周度分析（周一到周日）
     # 12. 提供月份选择
-    valid_months = sorted(df_unpaid_zhexiantu['月份'].unique())
+    valid_months = sorted_months
     selected_month = st.selectbox("🔎选择查看具体周数据的月份", valid_months, index=len(valid_months) - 1)
 
-    # 13. 按周汇总（包含跨月周的完整记录）
-    # 选择所选月份的记录
-    month_data = df_unpaid_zhexiantu[df_unpaid_zhexiantu['月份'] == selected_month]
-
-    # 获取该月份涉及的所有周范围
-    week_ranges = df_unpaid_zhexiantu[
-        (df_unpaid_zhexiantu['发票日期'].dt.to_period('M').astype(str) == selected_month) |
-        (df_unpaid_zhexiantu['周开始'].dt.to_period('M').astype(str) == selected_month) |
-        (df_unpaid_zhexiantu['周结束'].dt.to_period('M').astype(str) == selected_month)
-    ]['周范围'].unique()
-
-    # 按周汇总（基于发票日期在周范围内的记录）
-    weekly_summary_filtered = df_unpaid_zhexiantu[
-        (df_unpaid_zhexiantu['周范围'].isin(week_ranges)) &
-        (df_unpaid_zhexiantu['发票日期'] >= df_unpaid_zhexiantu['周开始']) &
-        (df_unpaid_zhexiantu['发票日期'] <= df_unpaid_zhexiantu['周结束'])
-    ].groupby(
-        ['部门', '周范围', '周开始', '周结束']
-    )['实际差额'].sum().reset_index()
+    # 13. 按周汇总（包含跨月周的完整记录）：与所选月份有交集的所有周
+    week_cube = ap_cube[ap_cube[WEEK_KEY_COL].isin(weeks_overlapping_month(ap_cube, month_key_of(selected_month)))]
+    weekly_summary_filtered = cube_by_week(week_cube, ['实际差额'])[['部门', '周范围', '周开始', '周结束', '实际差额']]
+    weekly_summary_filtered['实际差额'] = from_cents(weekly_summary_filtered['实际差额'])
+    weekly_summary_filtered = limit_series(weekly_summary_filtered, ['实际差额'], x_cols=['周范围', '周开始', '周结束'])
 
     # 确保按周开始日期排序
-    weekly_summary_filtered['周开始'] = pd.to_datetime(weekly_summary_filtered['周开始'])
     weekly_summary_filtered = weekly_summary_filtered.sort_values(by='周开始').reset_index(drop=True)
 
-    # 3. 计算每个周的“总未付款金额”和“总发票金额”
-    weekly_totals_dict = df_unpaid_zhexiantu[
-        df_unpaid_zhexiantu['周范围'].isin(week_ranges)
-    ].groupby('周范围')['实际差额'].sum().to_dict()
-
-    weekly_invoice_totals_dict = df_unpaid_zhexiantu[
-        df_unpaid_zhexiantu['周范围'].isin(week_ranges)
-    ].groupby('周范围')['发票金额'].sum().to_dict()
+    # 3. 计算每个周的“总未付款金额”和“总发票金额”（所有部门合计）
+    weekly_totals = cube_by_week(week_cube, ['实际差额', '发票金额'], by_department=False).set_index('周范围')
+    weekly_totals_dict = from_cents(weekly_totals['实际差额']).to_dict()
+    weekly_invoice_totals_dict = from_cents(weekly_totals['发票金额']).to_dict()
 
     # 4. 映射总发票金额和总未付款金额
     weekly_summary_filtered['总发票金额'] = weekly_summary_filtered['周范围'].map(weekly_invoice_totals_dict)
@@ -322,67 +250,52 @@ def ap_unpaid_query():
 
     # 5. 新增一个代码块功能， 统计截止至当前 周 的未付款金额
     
-    # 5.1 按“周范围”分组，对“实际差额”列求和
-    # - groupby('周范围')：以“周范围”作为分组依据
-    # - ['实际差额'].sum()：只对“实际差额”列进行求和，得到每周未付款的总金额
-    # - reset_index(name='实际差额')：将分组结果从 Series 转换为 DataFrame，并将求和列命名为“实际差额”
-    # 默认情况下，pandas 是按字符串的 字典序（lexicographical order） 进行排序的，所以如果你使用的“周范围”字符串都是以 起始日期格式（如 YYYY-MM-DD） 开头，那么排序是可控且正确的。
-    df_week_accumulation_unpaid = df_unpaid_zhexiantu.groupby('周范围')['实际差额'].sum().reset_index(name='实际差额')
-
-    # 5.2 计算每一周的“累计未付金额”
-    # - .cumsum()：对“实际差额”列按顺序执行累计求和（逐周相加）
-    # - 新增一列“累计未付金额”，用于后续展示付款趋势
-    df_week_accumulation_unpaid['累计未付金额'] = df_week_accumulation_unpaid['实际差额'].cumsum()
-
-    # 5.3 将“累计未付金额”映射回原始周汇总表 weekly_summary_filtered
-    # - set_index('周范围')：将“周范围”设置为索引，以便于按“周范围”查找
-    # - map(...)：根据 weekly_summary_filtered 中的“周范围”字段，匹配并添加对应的“累计未付金额”
-    weekly_summary_filtered['累计未付金额'] = weekly_summary_filtered['周范围'].map(
-        df_week_accumulation_unpaid.set_index('周范围')['累计未付金额']
-    )
-
-
-
-
-    # 56. 添加 hover 提示信息（HTML 格式）
-    weekly_summary_filtered['提示信息'] = weekly_summary_filtered.apply(
-        lambda row: 
-                    f"🔹 截止至{row['周范围']}<br>"
-                    
-                    f"累计未付金额：{row['累计未付金额']:,.0f}<br>"
-        
-                    f"本周发票金额：{row['总发票金额']:,.0f}<br>"
-                    f"本周未付金额：{row['总未付金额']:,.0f}<br>"
-                    f"本周未付比例：{row['总未付金额'] / row['总发票金额']:.1%}<br>"
-                    
-                    f"<br>"
-
-                    f"部门：{row['部门']}<br>"
-                    f"未付金额：{row['实际差额']:,.0f}<br>"
-                    f"占比：{row['实际差额'] / row['总发票金额']:.1%}",
-        axis=1
+    # 5.1 每一周的“累计未付金额” = 截止到该周周日（周结束）的累计值
+    # - 直接从 AP 累计索引中二分查找，不再对全量数据按“周范围”分组后再 cumsum
+    weekly_summary_filtered['累计未付金额'] = ap_as_of(ap_index, weekly_summary_filtered['周结束']) / CENTS_PER_UNIT
+
+
+
+
+    # 6. 添加 hover 提示信息（由 Plotly 按模板格式化）
+    weekly_summary_filtered['本周未付比例'] = safe_ratio(weekly_summary_filtered['总未付金额'], weekly_summary_filtered['总发票金额'])
+    weekly_summary_filtered['占比'] = safe_ratio(weekly_summary_filtered['实际差额'], weekly_summary_filtered['总发票金额'])
+    week_hover_cols, week_hover = hover_fields(
+        "🔹 截止至{周范围}<br>"
+        "累计未付金额：{累计未付金额:,.0f}<br>"
+        "本周发票金额：{总发票金额:,.0f}<br>"
+        "本周未付金额：{总未付金额:,.0f}<br>"
+        "本周未付比例：{本周未付比例:.1%}<br>"
+        "<br>"
+        "部门：{部门}<br>"
+        "未付金额：{实际差额:,.0f}<br>"
+        "占比：{占比:.1%}"
     )
     # 17. 绘制周度折线图
     # 确保 X 轴按时间顺序排列
-    fig_week = px.line(
-        weekly_summary_filtered,
-        x="周范围",
-        y="实际差额",
-        color="部门",
-        title=f"{selected_month} 每周各部门未付账金额",
-        markers=True,
-        labels={"实际差额": "未付账金额", "周范围": "周"},
-        line_shape="linear",
-        color_discrete_map=color_map,
-        hover_data={'提示信息': True},
-        category_orders={"周范围": weekly_summary_filtered['周范围'].tolist()}  # 明确指定 X 轴顺序
-    )
-
-    fig_week.update_traces(
-        text=weekly_summary_filtered["实际差额"].round(0).astype(int),
-        textposition="top center",
-        hovertemplate="%{customdata[0]}"
-    )
+    def build_week_figure():
+        fig = px.line(
+            weekly_summary_filtered,
+            x="周范围",
+            y="实际差额",
+            color="部门",
+            title=f"{selected_month} 每周各部门未付账金额",
+            markers=True,
+            labels={"实际差额": "未付账金额", "周范围": "周"},
+            line_shape="linear",
+            color_discrete_map=color_map,
+            custom_data=week_hover_cols,
+            text=point_labels(weekly_summary_filtered["实际差额"]),
+            category_orders={"周范围": weekly_summary_filtered['周范围'].tolist()}  # 明确指定 X 轴顺序
+        )
+        fig.update_traces(
+            textposition="top center",
+            hovertemplate=week_hover
+        )
+        return fig
+
+    # 图表 JSON 按 (数据版本, 所选月份) 缓存
+    fig_week = cached_figure("unpaid_week", (data_version(df_unpaid_zhexiantu), selected_month), build_week_figure)
 
     # 18. 显示周度图表
     st.plotly_chart(fig_week, key="weekly_unpaid_chart001")
@@ -390,36 +303,40 @@ def ap_unpaid_query():
 
 
     # 8. 生成交互式柱状图
-    bar_df = filtered_time_only.groupby("部门")[['应付未付差额']].sum().reset_index()
-    bar_df['应付未付差额'] = bar_df['应付未付差额'].round(0).astype(int)
-    fig_bar = px.bar(
-        bar_df,
-        x="部门",
-        y="应付未付差额",
-        color="部门",
-        title="选中部门应付未付差额",
-        text="应付未付差额",
-        labels={"应付未付差额": "金额（$ CAD）"},
-        color_discrete_map=color_map
-    )
-    fig_bar.update_traces(textposition="outside")
+    # - 部门过多时金额较小的部门合并为“其他”；柱状图 / 饼图 JSON 按 (数据版本, 发票日期范围) 缓存
+    bar_df = filtered_time_only.groupby("部门", observed=True)[['应付未付差额']].sum().reset_index()
+    bar_df = limit_series(bar_df, ['应付未付差额'])
+    bar_df['应付未付差额'] = from_cents(bar_df['应付未付差额']).round(0).astype(int)
+    chart_state = (data_version(df_unpaid_zhexiantu), start_date, end_date)
+
+    def build_bar_figure():
+        fig = px.bar(
+            bar_df,
+            x="部门",
+            y="应付未付差额",
+            color="部门",
+            title="选中部门应付未付差额",
+            text="应付未付差额",
+            labels={"应付未付差额": "金额（$ CAD）"},
+            color_discrete_map=color_map
+        )
+        fig.update_traces(textposition="outside")
+        return fig
 
     # 9. 生成交互式饼状图
-    fig_pie = px.pie(
-        bar_df,
-        names="部门",
-        values="应付未付差额",
-        title="所有部门占总应付差额比例",
-        labels={"应付未付差额": "金额（$ CAD）"},
-        hole=0.4,
-        color_discrete_map=color_map
-    )
-
-    fig_pie.update_traces(marker=dict(colors=[color_map.get(dept, '#CCCCCC') for dept in bar_df['部门']]))
+    def build_pie_figure():
+        fig = px.pie(
+            bar_df,
+            names="部门",
+            values="应付未付差额",
+            title="所有部门占总应付差额比例",
+            labels={"应付未付差额": "金额（$ CAD）"},
+            hole=0.4,
+            color_discrete_map=color_map
+        )
+        fig.update_traces(marker=dict(colors=[color_map.get(dept, '#CCCCCC') for dept in bar_df['部门']]))
+        return fig
 
     # 10. 显示柱状图和饼状图
-    st.plotly_chart(fig_bar)
-    st.plotly_chart(fig_pie)
-
-
-
+    st.plotly_chart(cached_figure("unpaid_bar", chart_state, build_bar_figure))
+    st.plotly_chart(cached_figure("unpaid_pie", chart_state, build_pie_figure))
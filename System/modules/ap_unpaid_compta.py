@@ -1,23 +1,22 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import timedelta
 import numpy as np
 
 from ui.sidebar import get_selected_departments
-from modules.data_loader import load_supplier_data
+from modules.data_loader import load_supplier_data, data_version
+from modules.reconcile import reconcile_month_start
+from modules.payment_rules import valid_cheque_mask, letter_cheque_mask, bank_paid_amount
+from ui.table_style import highlight_summary_rows
+from modules.money import display_amounts, format_amount
+from ui.export_buttons import render_export_buttons
+from ui.paged_table import render_paged_table
 
 
 
 def style_dataframe(df):
-    def highlight_rows(row):
-        if isinstance(row['部门'], str):
-            if row['部门'].endswith("汇总"):
-                return ['background-color: #E8F6F3'] * len(row)
-            elif row['部门'] == '总计':
-                return ['background-color: #FADBD8'] * len(row)
-        return [''] * len(row)
-    return df.style.apply(highlight_rows, axis=1).format({
+    # 部门小计行（XX 汇总）浅绿色，总计行粉红色
+    return highlight_summary_rows(display_amounts(df), '部门', subtotal_color='#E8F6F3', total_color='#FADBD8').format({
         '发票金额': "{:,.2f}",
         '实际支付金额': "{:,.2f}",
         '应付未付差额': "{:,.2f}",
@@ -27,10 +26,11 @@ def style_dataframe(df):
    
     })
 
-# 此版本专用于会计做账使用，以发票日期为准，截止日期以银行对账日期为准，由此计算是在这段时间内完成付款，未完成的按 应付未付进行处理
-def ap_unpaid_query_compta():
+# ✅ 派生阶段（按数据版本缓存）：推导 银行假定过账日期 和 银行对账日期
+@st.cache_data(max_entries=4, show_spinner=False)
+def derive_reconcile_columns(_df, version):
 
-    df = load_supplier_data()
+    df = _df
 
     # 因为会计做账，本次进处理采购类 purchase 的项目，因此仅筛选保留如下 部门项目
     # 【如需仅保留 采购类项目，请取消注释】
@@ -49,28 +49,6 @@ def ap_unpaid_query_compta():
 
 
 
-    # -------------------------------
-    # 3. 定义银行对账日期计算函数（通用）
-    # -------------------------------
-    # 2024-03-15	15号 < 25号 → 本月对账	2024-03-01
-    # 2024-03-25	25号 ≥ 25 → 下月对账	2024-04-01
-    # 2024-12-30	30号 ≥ 25 → 跨年 → 次年1月	2025-01-01 
-    # 2024-06-01	1号 < 25 → 本月对账	2024-06-01
-
-    def calculate_reconcile_date(posting_date: pd.Timestamp) -> pd.Timestamp:
-        if pd.isna(posting_date):
-            return pd.NaT
-        if posting_date.day >= 25:
-            month = (posting_date.month % 12) + 1
-            year = posting_date.year if posting_date.month < 12 else posting_date.year + 1
-        else:
-            month = posting_date.month
-            year = posting_date.year
-        return pd.Timestamp(f"{year}-{month:02d}-01")
-
-
-
-
     # ——————————————— 目的说明 ———————————————
     # 1) 条件1（mask_star）：
     #    仅在「银行对账日期为空」时，才对「公司名称以 * 结尾」的记录进行自动规则处理；
@@ -81,7 +59,7 @@ def ap_unpaid_query_compta():
     # 3) 合并条件（mask_target = 条件1 or 条件2），对命中的行：
     #    - 若开支票日期为空：设置 开支票日期 = 发票日期
     #    - 设置 银行假定过账日期 = 开支票日期 + 7 天
-    #    - 用 calculate_reconcile_date(银行假定过账日期) 推导 银行对账日期
+    #    - 用 reconcile_month_start(银行假定过账日期) 推导 银行对账日期
     #    注：全部用 df.loc[...] 进行就地赋值，避免 SettingWithCopyWarning。
 
     # ===================== 条件 1 =====================
@@ -101,8 +79,8 @@ def ap_unpaid_query_compta():
     # - df['开支票日期'].isna()：若已有开支票日期，尊重原始数据，不重复/不覆盖。
     mask_no_star_and_letter_cheque = (
         ~df['公司名称'].astype(str).str.contains(r'\*', na=False)
-        & ~df['付款支票号'].astype(str).str.strip().str.lower().isin(['', 'nan', 'none', 'null'])
-        & df['付款支票号'].astype(str).str.match(r'^[A-Za-z]', na=False)
+        & valid_cheque_mask(df['付款支票号'])
+        & letter_cheque_mask(df['付款支票号'])
         & df['开支票日期'].isna()
     )
 
@@ -131,10 +109,10 @@ def ap_unpaid_query_compta():
     # ===================== 计算“银行对账日期” =====================
     # 对【目标行】：根据“银行假定过账日期”计算“银行对账日期”。
     # 说明：
-    # - calculate_reconcile_date(日期) 通常用于把 +7 天后的日期“对齐”为银行实际过账日，
-    #   比如跳过周末/法定假日等（具体取决于你自定义的函数逻辑）。
-    df.loc[mask_target, '银行对账日期'] = df.loc[mask_target, '银行假定过账日期'].apply(
-        calculate_reconcile_date
+    # - reconcile_month_start(日期) 把 +7 天后的日期“对齐”为银行对账月份（25 号及以后归下月 1 号），
+    #   整列一次性计算，不再逐行 apply。
+    df.loc[mask_target, '银行对账日期'] = reconcile_month_start(
+        df.loc[mask_target, '银行假定过账日期']
     )
 
 
@@ -150,10 +128,99 @@ def ap_unpaid_query_compta():
     # ✅ 设定：银行假定过账日期 = 开支票日期 + 7天
     df.loc[extra_mask, '银行假定过账日期'] = df.loc[extra_mask, '开支票日期'] + pd.Timedelta(days=7)
 
-    # ✅ 重新计算：银行对账日期 = calculate_reconcile_date(银行假定过账日期)
-    df.loc[extra_mask, '银行对账日期'] = df.loc[extra_mask, '银行假定过账日期'].apply(calculate_reconcile_date)
+    # ✅ 重新计算：银行对账日期 = reconcile_month_start(银行假定过账日期)
+    df.loc[extra_mask, '银行对账日期'] = reconcile_month_start(df.loc[extra_mask, '银行假定过账日期'])
+
+    return df
+
+
+# ✅ 采购类部门
+PURCHASE_DEPARTMENTS = ['冻部', '厨房', '杂货', '肉部', '菜部', '美妆', '酒水', '面包', '鱼部', '牛奶生鲜']
+PURCHASE_DEPT_OPTION = '采购类: 冻部 / 厨房 / 杂货 / 肉部 / 菜部 / 美妆 / 酒水 / 面包 / 鱼部 / 牛奶生鲜'
+
+# 明细表中的日期列和数值列
+AP_DATE_COLS = ['发票日期','开支票日期','银行对账日期','银行假定过账日期']
+AP_NUM_COLS  = ['发票金额','TPS','TVQ','实际支付金额','付款支票总额','银行实际支付金额','应付未付额AP']
+
+# ✅ 应付未付快照缓存（按截止日期）：最多保留 24 个（约两年的月末截止日），
+#    超出后淘汰最久未使用的条目（LRU）；缓存键包含数据版本号，数据更新后旧快照自动失效
+AP_SNAPSHOT_CACHE_SIZE = 24
 
 
+@st.cache_data(max_entries=AP_SNAPSHOT_CACHE_SIZE, show_spinner=False)
+def compute_ap_snapshot(_df, version, start_date, end_date, dept_choice):
+    """
+    计算某一截止日期下的应付未付结果，返回：
+    (发票级明细 filtered_df, 展示用明细 df_show, 仅含应付未付的明细 df_show1, 部门汇总 grouped_df)
+    """
+    filtered_df = _df[(_df['发票日期'] >= start_date) & (_df['发票日期'] <= end_date)]
+
+    # ✅ 根据部门类型进一步筛选
+    if dept_choice == PURCHASE_DEPT_OPTION:
+        filtered_df = filtered_df[filtered_df['部门'].isin(PURCHASE_DEPARTMENTS)]
+
+    # ✅ 1. 条件判断：银行对账日期为空或晚于用户选定的结束日期，则记为未支付,标记为0
+    #    使用 payment_rules 中的列式规则（布尔掩码 + np.where），不再逐行 apply
+    filtered_df = filtered_df.copy()
+    filtered_df['银行实际支付金额'] = bank_paid_amount(
+        filtered_df['实际支付金额'], filtered_df['银行对账日期'], end_date
+    )
+
+    # ✅ 2. 新增字段：应付未付额AP
+    filtered_df['应付未付额AP'] = filtered_df['发票金额'] - filtered_df['银行实际支付金额']
+
+
+
+
+
+
+    # 仅保留并按顺序展示这些列
+    cols = [
+        '公司名称','部门','发票号','发票日期','发票金额','TPS','TVQ',
+        '付款支票号','实际支付金额','付款支票总额','开支票日期',
+        '银行对账日期','银行假定过账日期','银行实际支付金额','应付未付额AP'
+    ]
+    existing_cols = [c for c in cols if c in filtered_df.columns]
+    df_show = filtered_df.loc[:, existing_cols].copy()
+
+    # 定义日期列
+    date_cols = AP_DATE_COLS
+
+    # 统一为 datetime（显示时用 YYYY-MM-DD）
+    for c in [x for x in date_cols if x in df_show.columns]:
+        try:
+            df_show[c] = pd.to_datetime(df_show[c], errors='coerce').dt.tz_localize(None)
+        except TypeError:
+            df_show[c] = pd.to_datetime(df_show[c], errors='coerce')
+
+    # 金额列均为整数“分”，无需再保留两位小数；显示时再换算为“元”
+
+    # 去除 应付未付额AP 为空的数据以及等于0的数据（整数比较，不受浮点尾差影响）
+    df_show1 = df_show.copy()
+    df_show1 = df_show1[df_show1['应付未付额AP'].notna() & (df_show1['应付未付额AP'] != 0)]
+
+
+    # ✅ 3. 汇总（按部门）
+    grouped_df = filtered_df.groupby('部门', as_index=False, observed=True)[
+        ['发票金额', 'TPS', 'TVQ', '银行实际支付金额', '应付未付额AP']
+    ].sum()
+
+    # ✅ 4. 添加总计行
+    total_row = grouped_df[['发票金额', 'TPS', 'TVQ', '银行实际支付金额', '应付未付额AP']].sum()
+    total_row['部门'] = '总计'
+    grouped_df = pd.concat([grouped_df, pd.DataFrame([total_row])], ignore_index=True)
+
+    return filtered_df, df_show, df_show1, grouped_df
+
+
+# 此版本专用于会计做账使用，以发票日期为准，截止日期以银行对账日期为准，由此计算是在这段时间内完成付款，未完成的按 应付未付进行处理
+def ap_unpaid_query_compta():
+
+    df = load_supplier_data()
+
+    # ✅ 银行假定过账日期 / 银行对账日期 只依赖数据本身，与页面控件无关：
+    #    每次数据加载只推导一次并缓存，之后切换日期/部门只做筛选
+    df = derive_reconcile_columns(df, data_version(df))
 
     # # 安全检查
     # min_date = df['发票日期'].min()
@@ -240,101 +307,50 @@ def ap_unpaid_query_compta():
         st.error("❌ 起始日期不能晚于结束日期，请重新选择。")
         st.stop()
 
-    filtered_df = df[(df['发票日期'] >= start_date) & (df['发票日期'] <= end_date)]
-
-
-
     # ✅ 部门选择下拉框
-    purchase_departments = ['冻部', '厨房', '杂货', '肉部', '菜部', '美妆', '酒水', '面包', '鱼部', '牛奶生鲜']
-    dept_choice = st.selectbox("🏷️ 请选择部门类型", ['全部', '采购类: 冻部 / 厨房 / 杂货 / 肉部 / 菜部 / 美妆 / 酒水 / 面包 / 鱼部 / 牛奶生鲜'])
+    dept_choice = st.selectbox("🏷️ 请选择部门类型", ['全部', PURCHASE_DEPT_OPTION])
 
-    # ✅ 根据部门类型进一步筛选
-    if dept_choice == '采购类: 冻部 / 厨房 / 杂货 / 肉部 / 菜部 / 美妆 / 酒水 / 面包 / 鱼部 / 牛奶生鲜':
-        filtered_df = filtered_df[filtered_df['部门'].isin(purchase_departments)]
-
-
-    # ✅ 同步原始金额
-    filtered_df['银行实际支付金额'] = df['实际支付金额']
-
-    # ✅ 1. 条件判断：银行对账日期为空或晚于用户选定的结束日期，则记为未支付,标记为0
-    filtered_df['银行实际支付金额'] = filtered_df.apply(
-        lambda row: 0 if pd.isna(row['银行对账日期']) or row['银行对账日期'] > end_date else row['实际支付金额'],
-        axis=1
+    # ✅ 按 (起始日期, 结束日期, 部门类型) 取应付未付快照：
+    #    来回切换月末 25 号截止日期时，直接命中缓存，无需重新计算
+    filtered_df, df_show, df_show1, grouped_df = compute_ap_snapshot(
+        df, data_version(df), start_date, end_date, dept_choice
     )
 
-    # ✅ 2. 新增字段：应付未付额AP
-    filtered_df['应付未付额AP'] = filtered_df['发票金额'] - filtered_df['银行实际支付金额']
-
-
-
-
-
-
-    # 仅保留并按顺序展示这些列
-    cols = [
-        '公司名称','部门','发票号','发票日期','发票金额','TPS','TVQ',
-        '付款支票号','实际支付金额','付款支票总额','开支票日期',
-        '银行对账日期','银行假定过账日期','银行实际支付金额','应付未付额AP'
-    ]
-    existing_cols = [c for c in cols if c in filtered_df.columns]
-    df_show = filtered_df.loc[:, existing_cols].copy()
-
     # 定义日期列和数值列
-    date_cols = ['发票日期','开支票日期','银行对账日期','银行假定过账日期']
-    num_cols  = ['发票金额','TPS','TVQ','实际支付金额','付款支票总额','银行实际支付金额','应付未付额AP']
-
-    # 统一为 datetime（显示时用 YYYY-MM-DD）
-    for c in [x for x in date_cols if x in df_show.columns]:
-        try:
-            df_show[c] = pd.to_datetime(df_show[c], errors='coerce').dt.tz_localize(None)
-        except TypeError:
-            df_show[c] = pd.to_datetime(df_show[c], errors='coerce')
-
-    # 数值列转数值并保留两位小数
-    for c in [x for x in num_cols if x in df_show.columns]:
-        df_show[c] = pd.to_numeric(df_show[c], errors='coerce').round(2)
+    date_cols = AP_DATE_COLS
+    num_cols  = AP_NUM_COLS
 
     st.info("数据 银行对账 处理完成，请查看结果。")
 
-    # 去除 应付未付额AP 为空的数据以及等于0的数据
-    # 转成数值并保留两位小数
-    df_show1 = df_show.copy() 
-    df_show1['应付未付额AP'] = pd.to_numeric(df_show1['应付未付额AP'], errors='coerce').round(2)
-    # 去除为空和等于 0 的行
-    df_show1 = df_show1[df_show1['应付未付额AP'].notna() & (df_show1['应付未付额AP'] != 0)]
-
-
     st.success(
         f"📋 共筛选出 {len(df_show1)} 条记录，"
-        f"发票总金额：{filtered_df['发票金额'].sum():,.2f}，"
-        f"银行实际支付金额：{filtered_df['银行实际支付金额'].sum():,.2f}，"
-        f"应付未付额AP：{filtered_df['应付未付额AP'].sum():,.2f}"
+        f"发票总金额：{format_amount(filtered_df['发票金额'].sum())}，"
+        f"银行实际支付金额：{format_amount(filtered_df['银行实际支付金额'].sum())}，"
+        f"应付未付额AP：{format_amount(filtered_df['应付未付额AP'].sum())}"
     )
 
 
     st.info("仅包含 应付未付额AP ")
     # 用 column_config 控制显示格式（日期 yyyy-mm-dd，数值保留两位）
-    st.dataframe(
-        df_show1,
-        use_container_width=True,
-        column_config={
-            **{c: st.column_config.DateColumn(format="YYYY-MM-DD") for c in date_cols if c in df_show1.columns},
-            **{c: st.column_config.NumberColumn(format="%.2f") for c in num_cols if c in df_show1.columns},
-        }
+    # 分页显示：服务器端排序、分页，只发送当前页（金额也只对当前页换算为“元”）
+    ap_column_config = {
+        **{c: st.column_config.DateColumn(format="YYYY-MM-DD") for c in date_cols if c in df_show.columns},
+        **{c: st.column_config.NumberColumn(format="%.2f") for c in num_cols if c in df_show.columns},
+    }
+    render_paged_table(df_show1, key="ap_unpaid_table", prepare=display_amounts, column_config=ap_column_config)
+    # 导出应付未付明细（点击时才生成文件，Parquet 供记账工具导入）
+    render_export_buttons(
+        lambda: display_amounts(df_show1),
+        file_stem=f"应付未付AP明细_{end_date.strftime('%Y%m%d')}",
+        key="ap_unpaid_export",
+        sheet_name='应付未付AP',
+        money_columns=num_cols,
     )
 
 
 
     st.info("完整数据")
-    # 用 column_config 控制显示格式（日期 yyyy-mm-dd，数值保留两位）
-    st.dataframe(
-        df_show,
-        use_container_width=True,
-        column_config={
-            **{c: st.column_config.DateColumn(format="YYYY-MM-DD") for c in date_cols if c in df_show.columns},
-            **{c: st.column_config.NumberColumn(format="%.2f") for c in num_cols if c in df_show.columns},
-        }
-    )
+    render_paged_table(df_show, key="ap_full_table", prepare=display_amounts, column_config=ap_column_config)
 
 
 
@@ -344,24 +360,9 @@ def ap_unpaid_query_compta():
 
 
 
-    # ✅ 3. 汇总（按部门）
-    grouped_df = filtered_df.groupby('部门', as_index=False)[
-        ['发票金额', 'TPS', 'TVQ', '银行实际支付金额', '应付未付额AP']
-    ].sum().round(2)
-
-    # ✅ 4. 添加总计行
-    total_row = grouped_df[['发票金额', 'TPS', 'TVQ', '银行实际支付金额', '应付未付额AP']].sum().round(2)
-    total_row['部门'] = '总计'
-    grouped_df = pd.concat([grouped_df, pd.DataFrame([total_row])], ignore_index=True)
-
     # ✅ 5. 样式：总计行淡红色
-    def highlight_total_row(row):
-        return ['background-color: #ffe6e6'] * len(row) if row['部门'] == '总计' else [''] * len(row)
-
     styled_summary_df = (
-        grouped_df
-        .style
-        .apply(highlight_total_row, axis=1)
+        highlight_summary_rows(display_amounts(grouped_df), '部门', total_color='#ffe6e6')
         .format({
             '发票金额': '{:,.2f}',
             'TPS': '{:,.2f}',
@@ -374,9 +375,9 @@ def ap_unpaid_query_compta():
     # ✅ 6. 显示汇总表
     st.success(
         f"📋 共筛选出 {len(filtered_df)} 条记录，"
-        f"发票总金额：{filtered_df['发票金额'].sum():,.2f}，"
-        f"银行实际支付金额：{filtered_df['银行实际支付金额'].sum():,.2f}，"
-        f"应付未付额AP：{filtered_df['应付未付额AP'].sum():,.2f}"
+        f"发票总金额：{format_amount(filtered_df['发票金额'].sum())}，"
+        f"银行实际支付金额：{format_amount(filtered_df['银行实际支付金额'].sum())}，"
+        f"应付未付额AP：{format_amount(filtered_df['应付未付额AP'].sum())}"
     )
 
     st.subheader("📊 按部门汇总应付未付情况")
@@ -414,43 +415,38 @@ def ap_unpaid_query_compta():
         else:
             df_to_display = filtered_display_df[filtered_display_df['部门'] == selected_dept].copy()
 
-        # ✅ 按公司名称 + 发票日期排序
-        df_to_display = df_to_display.sort_values(by=['公司名称', '发票日期'])
+        # ✅ 按公司名称 + 发票日期排序（选择“全部”时先按部门）
+        sort_cols = ['公司名称', '发票日期'] if selected_dept != '全部' else ['部门', '公司名称', '发票日期']
+        df_to_display = df_to_display.sort_values(by=sort_cols)
 
         # ✅ 金额列
         amount_cols = ['发票金额', 'TPS', 'TVQ', '实际支付金额', '银行实际支付金额', '应付未付额AP']
 
-        # ✅ 按部门分块（或仅一个）
-        grouped = df_to_display.groupby('部门') if selected_dept == '全部' else [(selected_dept, df_to_display)]
-
-        for dept, df_grp in grouped:
-            st.markdown(f"#### 🏷️ 部门：{dept}（共 {len(df_grp)} 条）")
-
-            # 添加汇总行
-            total_row = df_grp[amount_cols].sum().round(2)
-            total_row['公司名称'] = '总计'
-            total_row['部门'] = dept
-            total_row['发票号'] = ''
-            total_row['付款支票号'] = ''
-            total_row['发票日期'] = ''
-            total_row['开支票日期'] = ''
-            total_row['银行对账日期'] = ''
-
-            df_display = pd.concat([df_grp, pd.DataFrame([total_row])], ignore_index=True)
-
-            # 样式函数：总计行为淡蓝色
-            def highlight_total(row):
-                return ['background-color: #e6f0ff'] * len(row) if row['公司名称'] == '总计' else [''] * len(row)
-
-            styled_detail = (
-                df_display
-                .style
-                .apply(highlight_total, axis=1)
+        # ✅ 一张分页表格（选择“全部”时不再逐个部门渲染带样式的表格；各部门合计见上方汇总表）
+        st.markdown(f"#### 🏷️ 部门：{selected_dept}（共 {len(df_to_display)} 条）")
+
+        # 汇总行：固定显示在每一页末尾
+        total_row = df_to_display[amount_cols].sum()
+        total_row['公司名称'] = '总计'
+        total_row['部门'] = selected_dept
+        total_row['发票号'] = ''
+        total_row['付款支票号'] = ''
+        total_row['发票日期'] = ''
+        total_row['开支票日期'] = ''
+        total_row['银行对账日期'] = ''
+
+        # 样式：总计行为淡蓝色（当前页行数较多时不使用样式，改用 column_config 保留两位小数）
+        render_paged_table(
+            df_to_display,
+            key="ap_detail_table",
+            prepare=display_amounts,
+            style=lambda page: (
+                highlight_summary_rows(page, '公司名称', total_color='#e6f0ff')
                 .format({col: '{:,.2f}' for col in amount_cols})
-            )
-
-            # 显示表格
-            st.dataframe(styled_detail, use_container_width=True)
+            ),
+            footer=pd.DataFrame([total_row]),
+            column_config={col: st.column_config.NumberColumn(format="%.2f") for col in amount_cols},
+        )
 
 
 
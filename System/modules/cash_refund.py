@@ -1,77 +1,75 @@
 
 import streamlit as st
 import pandas as pd
-from modules.data_loader import load_cash_data
-import pandas as pd
+from ui.table_style import highlight_summary_rows
+from modules.data_loader import load_cash_data, data_version
+from modules.money import display_amounts
+from modules.table_builder import sorted_join
 from datetime import datetime
-from io import BytesIO
+from ui.export_buttons import render_export_buttons
 
 
 
 def style_dataframe(df):
-    def highlight_rows(row):
-        value = ""
+    # 优先使用 '年月' 作为标签列，否则使用 '供应商'
+    label_col = '年月' if '年月' in df.columns else '供应商'
 
-        # 优先使用 '年月'，否则尝试使用 '供应商'
-        if '年月' in row:
-            value = row['年月']
-        elif '供应商' in row:
-            value = row['供应商']
+    # 汇总行 蓝绿色，总计行 粉红色
+    return highlight_summary_rows(df, label_col, subtotal_color='#D1ECE8', total_color='#FADBD8').format(precision=2, na_rep="")
 
-        if isinstance(value, str):
-            if value.endswith("汇总"):
-                return ['background-color: #D1ECE8'] * len(row)  # 蓝绿色
-            elif value == "总计":
-                return ['background-color: #FADBD8'] * len(row)  # 粉红色
 
-        return [''] * len(row)
 
-    return df.style.apply(highlight_rows, axis=1).format(precision=2, na_rep="")
+# 导出明细中的金额列（导出 Excel 时按两位小数显示）
+CASH_EXPORT_MONEY_COLS = ['总金额', 'TPS', 'TVQ', '支票金额']
 
 
+# ✅ 分类号码 → 分类名称
+CATEGORY_MAPPING = {
+    1: '1_PURCHASE', 2: '2_OFFICE', 3: '3_R/M', 4: '4_BANK', 5: '5_BOOKKEEPING',
+    6: '6_Auto', 7: '7_EQUIPMENT RENTAL', 8: '8_TEL', 9: '9_Tax & License',
+    10: '10_Equip.', 11: '11_LHP', 12: '12_Leasehold Improvement',
+    13: '13_Brokerage', 14: '14_Advertisement', 15: '15_Computer',
+    16: '16_Hino Truck', 17: '17_Transport', 18: '18_MEALS'
+}
 
-def cash_refund():
-    
-    df_data = load_cash_data()
+
+# ✅ 每月汇总表（按现金账数据版本缓存）：分类映射、透视表、按月汇总、合并、总计行
+# - 切换下方的月份下拉框时直接命中缓存，不再重新透视和汇总
+@st.cache_data(max_entries=4, show_spinner=False)
+def build_cash_summary(_df, version):
+    df_data = _df
+    category_names = list(CATEGORY_MAPPING.values())
 
     # ✅ 步骤 4：将“分类号码”映射为分类名称
-    category_mapping = {
-        1: '1_PURCHASE', 2: '2_OFFICE', 3: '3_R/M', 4: '4_BANK', 5: '5_BOOKKEEPING',
-        6: '6_Auto', 7: '7_EQUIPMENT RENTAL', 8: '8_TEL', 9: '9_Tax & License',
-        10: '10_Equip.', 11: '11_LHP', 12: '12_Leasehold Improvement',
-        13: '13_Brokerage', 14: '14_Advertisement', 15: '15_Computer',
-        16: '16_Hino Truck', 17: '17_Transport', 18: '18_MEALS'
-    }
-    df_data['分类号码'] = pd.to_numeric(df_data['分类号码'], errors='coerce')
-    df_data['分类名称'] = pd.Categorical(df_data['分类号码'].map(category_mapping), categories=category_mapping.values())
+    category_codes = pd.to_numeric(df_data['分类号码'], errors='coerce')
+    category = pd.Categorical(category_codes.map(CATEGORY_MAPPING), categories=category_names)
 
     # ✅ 步骤 5：创建分类金额透视表（按“年月” + 分类统计“总金额”）
-    category_pivot_nan = df_data.pivot_table(
+    category_pivot_nan = pd.DataFrame({
+        '年月': df_data['年月'], '分类名称': category, '净值': df_data['净值'],
+    }).pivot_table(
         index='年月',
         columns='分类名称',
         values='净值',
         aggfunc='sum'
-    ).round(2).reset_index()
+    ).reset_index()
+    # 金额按“分”精确汇总后，再换算为“元”
+    category_pivot_nan = display_amounts(category_pivot_nan, category_names)
 
-    # ✅ 步骤 6：创建基础汇总（每月的总金额 / TPS / TVQ）
-    #core_summary = df_data.groupby('年月')[['总金额', 'TPS', 'TVQ']].sum().round(2).reset_index()
-    core_summary = df_data.groupby('年月').agg({
-        '支票号': lambda x: ', '.join(sorted(set(x))),  # 去重 + 排序 + 拼接
-        '总金额': 'sum',
-        'TPS': 'sum',
-        'TVQ': 'sum'
-    }).round(2).reset_index()
+    # ✅ 步骤 6：创建基础汇总（每月的支票号列表 / 总金额 / TPS / TVQ）
+    # 支票号：去重 + 排序 + 拼接（整体排序一次后分组拼接，见 modules/table_builder.py）
+    core_summary = df_data.groupby('年月')[['总金额', 'TPS', 'TVQ']].sum()
+    cheques = df_data[['年月', '支票号']].drop_duplicates()
+    core_summary.insert(0, '支票号', sorted_join(cheques['年月'], cheques['支票号'], ', '))
+    core_summary = display_amounts(core_summary.reset_index())
 
     # ✅ 步骤 7：合并两张表
     merged_summary_nan = pd.merge(core_summary, category_pivot_nan, on='年月', how='outer')
     merged_summary_nan = merged_summary_nan.sort_values(by='年月').reset_index(drop=True)
 
-    # ✅ 步骤 8：将分类金额中为 0.00 的值设为 NaN（只做在分类列上）
-    non_category_cols = ['年月', '总金额', 'TPS', 'TVQ']
-    category_cols = [col for col in merged_summary_nan.columns if col not in non_category_cols]
-    import numpy as np
-    for col in category_cols:
-        merged_summary_nan[col] = merged_summary_nan[col].apply(lambda x: np.nan if x == 0.00 else x)
+    # ✅ 步骤 8：将分类金额中为 0.00 的值设为 NaN（只做在分类列上，一次向量化 mask）
+    category_cols = [col for col in category_names if col in merged_summary_nan.columns]
+    merged_summary_nan[category_cols] = merged_summary_nan[category_cols].mask(merged_summary_nan[category_cols] == 0)
 
     # ✅ 步骤 9：添加汇总行（合计所有数值列）
     # 获取所有非文本列（数值列）并求和
@@ -86,11 +84,19 @@ def cash_refund():
     summary_row_df = pd.DataFrame([summary_dict])
 
     # 拼接到首尾
-    merged_summary_nan = pd.concat(
+    return pd.concat(
         [summary_row_df, merged_summary_nan, summary_row_df],
         ignore_index=True
     )
 
+
+def cash_refund():
+    
+    df_data = load_cash_data()
+
+    # ✅ 每月汇总表：每个现金账数据版本只计算一次
+    merged_summary_nan = build_cash_summary(df_data, data_version(df_data))
+
     st.markdown("""
         <h4 >
         💸 <strong>Xinya现金账Cash_Refund信息汇总</strong>
@@ -107,7 +113,7 @@ def cash_refund():
 
 
     # 假设 df_data 是你已经读取和处理过的数据
-    df_cash_detail_by_month = df_data.copy()
+    df_cash_detail_by_month = df_data
     valid_months = sorted(df_cash_detail_by_month['年月'].dropna().unique().tolist())
 
     # 🎛️ 顶部：标题和下载按钮放同一行
@@ -125,6 +131,7 @@ def cash_refund():
 
     # 🔍 根据选定月份筛选数据
     df_filtered = df_cash_detail_by_month[df_cash_detail_by_month['年月'] == selected_month].copy()
+    df_filtered['分类号码'] = pd.to_numeric(df_filtered['分类号码'], errors='coerce')
 
     # 按照支票号分组
     cheque_groups = df_filtered.groupby('支票号')
@@ -146,6 +153,9 @@ def cash_refund():
         # 重命名列名
         group_display = group_display.rename(columns={'年月': '现金cash记录月份'})
 
+        # 金额列由“分”换算为“元”（显示和导出用）
+        group_display = display_amounts(group_display)
+
 
         subtotal_row = pd.DataFrame([{
             '供应商': '汇总',
@@ -171,17 +181,14 @@ def cash_refund():
 
     # 📥 更新下载按钮内容（此处才触发）
     if all_groups_with_totals:
-        export_df = pd.concat(all_groups_with_totals, ignore_index=True)
-        output = BytesIO()
-        export_df.to_excel(output, index=False)
-        output.seek(0)
-        filename = f"{selected_month}_Cash_refund支票详情_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-        # 在上方右侧区域更新下载按钮
-        with col2:
-            download_placeholder.download_button(
+        file_stem = f"{selected_month}_Cash_refund支票详情_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+        # 在上方右侧区域更新下载按钮：点击时才合并并生成文件（Excel / CSV / Parquet，按内容缓存）
+        with download_placeholder.container():
+            render_export_buttons(
+                lambda: pd.concat(all_groups_with_totals, ignore_index=True),
+                file_stem=file_stem,
+                key="cash_refund_export",
                 label="📥 下载报表",
-                data=output,
-                file_name=filename,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                money_columns=CASH_EXPORT_MONEY_COLS,
             )
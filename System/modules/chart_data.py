@@ -0,0 +1,45 @@
+# 📁 modules/chart_data.py
+# 图表 hover 提示（各图表页面共用）：
+# 原来每张图都用 DataFrame.apply(lambda row: f"...", axis=1) 逐行拼出一段 HTML 文字作为 customdata，
+# 每次页面刷新都要重新拼接，发送到浏览器的 JSON 也很大。
+# 这里改为 customdata 只放原始数字 / 短文字，格式化交给 Plotly 的 hovertemplate（d3-format）完成：
+#   - 模板写法与 f-string 相同，例如 '付款金额：{实际支付金额:,.0f}<br>占比：{占比:.1%}'
+#   - hover_fields(模板) 返回 (custom_data 列名列表, hovertemplate)：
+#     列名列表传给 px.line(custom_data=...)，hovertemplate 传给 fig.update_traces(...)
+import re
+
+import numpy as np
+import pandas as pd
+
+# 模板中的字段：{列名} 或 {列名:格式}
+FIELD_PATTERN = re.compile(r'\{([^{}:]+)(?::([^{}]*))?\}')
+
+
+def hover_fields(template):
+    """把 f-string 风格的模板转换为 Plotly hovertemplate，返回 (用到的列名列表, hovertemplate)"""
+    columns = []
+
+    def to_customdata(match):
+        name, fmt = match.group(1), match.group(2)
+        if name not in columns:
+            columns.append(name)
+        ref = f"customdata[{columns.index(name)}]"
+        return f"%{{{ref}:{fmt}}}" if fmt else f"%{{{ref}}}"
+
+    return columns, FIELD_PATTERN.sub(to_customdata, template)
+
+
+def safe_ratio(numerator, denominator):
+    """整列相除（用于 hover 中的“占比”）；分母为 0 或为空时结果为 NaN"""
+    numerator = pd.Series(numerator).to_numpy(dtype='float64', na_value=np.nan)
+    denominator = pd.Series(denominator).to_numpy(dtype='float64', na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = numerator / denominator
+    ratio[~np.isfinite(ratio)] = np.nan
+    return ratio
+
+
+def year_month_label(months):
+    """'2024-05' → '2024年05月'（整列字符串运算）"""
+    months = pd.Series(months).astype(str)
+    return months.str[:4] + '年' + months.str[5:] + '月'
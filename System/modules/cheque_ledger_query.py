@@ -1,69 +1,97 @@
 # 📁 modules/cheque_ledger_query.py
-import io
 import pandas as pd
 import streamlit as st
 from datetime import datetime
-from modules.data_loader import load_supplier_data
+from modules.data_loader import load_supplier_data, data_version
+from modules.payment_rules import valid_cheque_mask, star_company_mask, auto_debit_mask
+from ui.table_style import highlight_summary_rows
+from modules.natural_sort import number_column
+from modules.table_builder import sorted_join
+from modules.money import display_amounts, from_cents, format_amount, amount_text
+from ui.export_buttons import render_export_buttons
 
-def cheque_ledger_query():
-    
-    df = load_supplier_data()
-
-    # ✅ 过滤无效支票号
-    df = df[df['付款支票号'].apply(lambda x: str(x).strip().lower() not in ['', 'nan', 'none'])]
-    df['付款支票号'] = df['付款支票号'].astype(str)
+# 支票总账中的金额列（发票金额 在总账里是拼接后的文字，不在其中）
+LEDGER_AMOUNT_COLS = ['实际支付金额', 'TPS', 'TVQ', '税后金额']
 
-    st.subheader("📒 当前支票总账查询")
-    #st.info("##### 💡 支票信息总账的搜索时间是按照 *🧾发票日期* 进行设置的，查询某个会计日期内的支票信息")
+LEDGER_COLUMNS = [
+    '付款支票号', '公司名称', '实际支付金额',
+    'TPS', 'TVQ', '税后金额',
+    '开支票日期', '银行对账日期',
+    '部门', '发票号', '发票金额'
+]
 
 
-    # ✅ 日期标准化
-    df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce')
-
+# ✅ 支票总账（按数据版本缓存）：每个支票号一行，切换筛选方式 / 对账日期时只对这张表做切片
+@st.cache_data(max_entries=4, show_spinner=False)
+def build_cheque_ledger(_df, version):
 
+    # ✅ 过滤无效支票号
+    df = _df[valid_cheque_mask(_df['付款支票号'])].copy()
+    df['付款支票号'] = df['付款支票号'].astype(str)
 
-    agg_funcs = {
+    grouped = df.groupby('付款支票号').agg({
         '公司名称': 'first',
-        #'部门': lambda x: ','.join(sorted(x.astype(str))),
         '部门': 'first',
-        '发票号': lambda x: ','.join(sorted(x.astype(str))),
-        '发票金额': lambda x: '+'.join(sorted(x.astype(str))),
         '银行对账日期': 'first',
         '开支票日期': 'first',
         '实际支付金额': 'sum',
         'TPS': 'sum',
         'TVQ': 'sum',
-    }
+        # 支票号排序键中的数字部分（加载时已算好）
+        number_column('付款支票号'): 'first',
+    })
 
-    grouped = df.groupby('付款支票号').agg(agg_funcs).reset_index()
+    # 发票号 用“,”、发票金额 用“+”拼接（组内按文字排序）
+    grouped['发票号'] = sorted_join(df['付款支票号'], df['发票号'].astype(str).fillna('nan'), ',')
+    grouped['发票金额'] = sorted_join(df['付款支票号'], from_cents(df['发票金额']).astype(str).fillna('nan'), '+')
+    grouped = grouped.reset_index()
 
     grouped['银行对账日期'] = pd.to_datetime(grouped['银行对账日期'], errors='coerce').dt.strftime('%Y-%m-%d')
     grouped['开支票日期'] = pd.to_datetime(grouped['开支票日期'], errors='coerce').dt.strftime('%Y-%m-%d')
     grouped['税后金额'] = grouped['实际支付金额'] - grouped['TPS'] - grouped['TVQ']
 
-
-
     # 仅保留 数字编号的 支票号码
     # 只保留以数字开头的付款支票号（用正则表达式）
-    grouped = grouped[grouped['付款支票号'].astype(str).str.match(r'^\d')]
+    grouped = grouped[grouped['付款支票号'].str.match(r'^\d')]
+
+    # 按照支票号的数字部分进行排序（数字以开头的部分为准，加载时已提取好）
+    grouped = grouped.sort_values(by=[number_column('付款支票号'), '付款支票号'], kind='stable')
+
+    # 重新排列列顺序
+    return grouped.reindex(columns=LEDGER_COLUMNS).reset_index(drop=True)
+
+
+
+def ledger_export_frame(ledger):
+    """支票总账导出表：金额换算为“元”，并附加 辅助匹配列（点击下载时才调用）"""
+    export_df = ledger.copy()
 
-    # 新增一列提取支票号中的数字部分（用于排序）
-    # 我只要这个提取结果的“第 0 列”（也就是唯一那一列），并把它变成一个 Series。
-    # 如果你不写 [0]，提取结果就是个 DataFrame，不能直接赋值到某个 Series 列里，也没法 .astype(int)，程序会报错或行为不对。
-    grouped['支票号数字'] = grouped['付款支票号'].astype(str).str.extract(r'^(\d+)')[0].astype(int)
+    # ✅ 新增辅助匹配列：支票号数字部分 + 金额（整列字符串运算）
+    # 提取数字部分：例如 CK889 → 889
+    export_df['辅助匹配列'] = (
+        export_df['付款支票号'].str.replace(r'\D', '', regex=True)
+        + '-'
+        + amount_text(export_df['实际支付金额'])
+    )
 
-    # 按照提取的数字部分进行排序
-    grouped = grouped.sort_values(by='支票号数字').drop(columns='支票号数字').reset_index(drop=True)
+    # 金额列由“分”换算为“元”
+    return display_amounts(export_df, LEDGER_AMOUNT_COLS)
 
-    desired_order = [
-        '付款支票号', '公司名称', '实际支付金额',
-        'TPS', 'TVQ', '税后金额',
-        '开支票日期', '银行对账日期',
-        '部门', '发票号', '发票金额'
-    ]
 
-    # 重新排列列顺序，保留你指定的列
-    grouped = grouped.reindex(columns=desired_order)
+def cheque_ledger_query():
+    
+    df = load_supplier_data()
+    grouped = build_cheque_ledger(df, data_version(df))
+
+    # ✅ 过滤无效支票号
+    df = df[valid_cheque_mask(df['付款支票号'])]
+
+    st.subheader("📒 当前支票总账查询")
+    #st.info("##### 💡 支票信息总账的搜索时间是按照 *🧾发票日期* 进行设置的，查询某个会计日期内的支票信息")
+
+
+    # ✅ 日期标准化
+    df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce')
 
 
     # ✅ 选择筛选方式：radio 控件
@@ -96,44 +124,18 @@ def cheque_ledger_query():
 
 
         if not grouped.empty:
-            def convert_df_to_excel(df_export):
-                export_df = df_export.copy()
-
-                # 格式化日期
-                export_df['银行对账日期'] = pd.to_datetime(export_df['银行对账日期'], errors='coerce').dt.strftime('%Y-%m-%d')
-                export_df['开支票日期'] = pd.to_datetime(export_df['开支票日期'], errors='coerce').dt.strftime('%Y-%m-%d')
-
-                # 保留两位小数的金额列
-                for col in ['实际支付金额', 'TPS', 'TVQ', '税后金额']:
-                    export_df[col] = pd.to_numeric(export_df[col], errors='coerce').round(2)
-
-                # ✅ 新增辅助匹配列：支票号数字部分 + 金额
-                # 提取数字部分：例如 CK889 → 889
-                export_df['辅助匹配列'] = export_df.apply(
-                    lambda row: f"{''.join(filter(str.isdigit, str(row['付款支票号'])))}-{format(row['实际支付金额'], '.2f')}",
-                    axis=1
-                )
-
-                # 导出 Excel
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                    export_df.to_excel(writer, index=False, sheet_name='支票总账')
-                    writer.close()
-                return buffer.getvalue()
-
-
-            excel_data = convert_df_to_excel(grouped)
-
             # ✅ 当前时间戳用于命名文件：如 20250606151515
             timestamp_str = datetime.now().strftime('%Y%m%d%H%M%S')
-            file_name = f"支票总账_{timestamp_str}.xlsx"
 
+            # 只有点击下载时才生成文件（Excel / CSV / Parquet，按内容缓存）
             with col_b:
-                st.download_button(
+                render_export_buttons(
+                    lambda: ledger_export_frame(grouped),
+                    file_stem=f"支票总账_{timestamp_str}",
+                    key="cheque_ledger_export",
                     label="📥 下载当前支票数据",
-                    data=excel_data,
-                    file_name=file_name,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    sheet_name='支票总账',
+                    money_columns=LEDGER_AMOUNT_COLS,
                 )
 
 
@@ -156,7 +158,7 @@ def cheque_ledger_query():
         # -------------------------------
         # ✅ 条件 1：公司名称以 "*" 结尾
         # -------------------------------
-        cond_company_star = df_source['公司名称'].str.endswith('*', na=False)
+        cond_company_star = star_company_mask(df_source['公司名称'])
         df_condition_1 = df_source[cond_company_star].copy()
         df_condition_1['来源'] = '公司名称以*结尾'
 
@@ -164,14 +166,8 @@ def cheque_ledger_query():
         # ✅ 条件 2：公司名称不以 "*" 结尾 且 支票号以字母开头
         # 首先清除无效支票号（空字符串、'nan'、'none' 等）
         # -------------------------------
-        invalid_values = ['', 'nan', 'none']
-        valid_cheque_mask = ~df_source['付款支票号'].str.strip().str.lower().isin(invalid_values)
-
         # 再构造符合“支票号以字母开头”的条件，同时公司名称不能以 * 结尾
-        cond_cheque_alpha = df_source['付款支票号'].str.match(r'^[A-Za-z]', na=False)
-        cond_company_non_star = ~df_source['公司名称'].str.endswith('*', na=False)
-
-        cond_combined = valid_cheque_mask & cond_cheque_alpha & cond_company_non_star
+        cond_combined = auto_debit_mask(df_source['公司名称'], df_source['付款支票号']) & ~cond_company_star
         df_condition_2 = df_source[cond_combined].copy()
         df_condition_2['来源'] = '支票号字母开头'
 
@@ -210,7 +206,7 @@ def cheque_ledger_query():
             df_display = df_filtered_PPA[['公司名称', '部门', '发票号', '发票日期', '发票金额', 'TPS', 'TVQ', '付款支票号']].copy()
             df_display['发票日期'] = df_display['发票日期'].dt.strftime('%Y-%m-%d')
             for col in ['发票金额', 'TPS', 'TVQ']:
-                df_display[col] = df_display[col].astype(float).map("{:.2f}".format)
+                df_display[col] = from_cents(df_display[col]).map("{:.2f}".format)
 
             # 显示结果
             st.dataframe(df_display, use_container_width=True)
@@ -262,9 +258,7 @@ def cheque_ledger_query():
 
             # 格式化
             #grouped["发票金额"] = grouped["发票金额"].round(2)
-            grouped["实际支付金额"] = grouped["实际支付金额"].round(2)
-            grouped["TPS"] = grouped["TPS"].round(2)
-            grouped["TVQ"] = grouped["TVQ"].round(2)
+            grouped = display_amounts(grouped, ["实际支付金额", "TPS", "TVQ"])
             grouped["发票日期"] = grouped["发票日期"].astype(str)
             grouped["最早发票日期"] = grouped["最早发票日期"].dt.strftime("%Y-%m-%d")
             grouped = grouped.reset_index(drop=True)
@@ -317,10 +311,10 @@ def cheque_ledger_query():
             #"TPS": round(grouped.loc[grouped['付款支票号'] == '总计', 'TPS'].sum(), 2),
             #"TVQ": round(grouped.loc[grouped['付款支票号'] == '总计', 'TVQ'].sum(), 2),
             #"税后金额": round(grouped.loc[grouped['付款支票号'] == '总计', '税后金额'].sum(), 2),
-            "实际支付金额": round(grouped['实际支付金额'].sum(), 2),
-            "TPS": round(grouped['TPS'].sum(), 2),
-            "TVQ": round(grouped['TVQ'].sum(), 2),
-            "税后金额": round(grouped['税后金额'].sum(), 2),
+            "实际支付金额": format_amount(grouped['实际支付金额'].sum()),
+            "TPS": format_amount(grouped['TPS'].sum()),
+            "TVQ": format_amount(grouped['TVQ'].sum()),
+            "税后金额": format_amount(grouped['税后金额'].sum()),
         }
 
 
@@ -365,10 +359,10 @@ def cheque_ledger_query():
             <h3>💰 总计</h3>
             <table class="summary-table">
                 <tr><th>项目</th><th>金额（元）</th></tr>
-                <tr><td>实际支付金额</td><td>{total_data['实际支付金额']:,.2f}</td></tr>
-                <tr><td>TPS</td><td>{total_data['TPS']:,.2f}</td></tr>
-                <tr><td>TVQ</td><td>{total_data['TVQ']:,.2f}</td></tr>
-                <tr><td>税后金额</td><td>{total_data['税后金额']:,.2f}</td></tr>
+                <tr><td>实际支付金额</td><td>{total_data['实际支付金额']}</td></tr>
+                <tr><td>TPS</td><td>{total_data['TPS']}</td></tr>
+                <tr><td>TVQ</td><td>{total_data['TVQ']}</td></tr>
+                <tr><td>税后金额</td><td>{total_data['税后金额']}</td></tr>
             </table>
         </div>
         """
@@ -379,15 +373,9 @@ def cheque_ledger_query():
         
 
 
-        # ✅ 设置样式
-        def highlight_total(row):
-            if row['付款支票号'] == '总计':
-                return ['background-color: #FADBD8'] * len(row)
-            return [''] * len(row)
-
+        # ✅ 设置样式：总计行粉红色
         st.dataframe(
-            grouped_table.style
-            .apply(highlight_total, axis=1)
+            highlight_summary_rows(display_amounts(grouped_table, LEDGER_AMOUNT_COLS), '付款支票号', total_color='#FADBD8')
             .format({
                 #'发票金额': '{:,.2f}',
                 '实际支付金额': '{:,.2f}',
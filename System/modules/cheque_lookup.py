@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
-from modules.data_loader import load_supplier_data
+from modules.data_loader import load_supplier_data, data_version
+from modules.lookup_index import load_cheque_index, lookup_rows
+from ui.table_style import highlight_summary_rows
+from modules.money import display_amounts
 
 
 def cheque_lookup_query():
@@ -11,23 +14,11 @@ def cheque_lookup_query():
     # 2. 显示查询页面标题
     st.subheader("🔍 支票号查询")
 
-    # 3. 提取所有非空支票号
-    # - dropna()：移除缺失值，确保没有 NaN 支票号
-    # - str.strip()：去掉前后空格，避免因空格导致的查询失败
-    # - unique()：获取唯一支票号列表，避免重复
-    all_cheques = df['付款支票号'].dropna()
-    all_cheques = all_cheques[all_cheques.astype(str).str.strip() != ''].astype(str).unique()
-
-    # 4. 支票号排序：数字在前，文本在后
-    # - 使用 isnumeric() 判断是否为纯数字
-    # - 数字按数值排序，文本按字母排序
-    # - c 是 all_cheques 列表中的每一个元素（即一个支票号），isnumeric() 检查字符串是否只包含数字（不包含负号、小数点或其他字符）
-    # - key 是一个可选参数，用于定义排序的规则
-    # - key=lambda x: int(x)：将字符串类型的支票号先转换为整数 (int(x))，然后再排序，确保按照数值大小排序，而不是按照字符串的字典顺序
-    # - sorted(iterable, key=None, reverse=False) 
-    numeric_cheques = sorted([c for c in all_cheques if c.isnumeric()], key=lambda x: int(x))
-    text_cheques = sorted([c for c in all_cheques if not c.isnumeric()])
-    sorted_cheques = numeric_cheques + text_cheques
+    # 3. 支票号索引（每个数据版本只构建一次，之后每次重跑直接复用）
+    # - options：所有非空支票号，已排好序（数字在前按数值排序，文本在后按字母排序）
+    # - positions：支票号（去前后空格）→ 行位置，查询时直接取行，不再扫描整列
+    cheque_index = load_cheque_index(df, data_version(df))
+    sorted_cheques = cheque_index['options']
 
     # 5. 创建下拉输入框
     # - options：支持空选项（即没有输入支票号）
@@ -47,15 +38,11 @@ def cheque_lookup_query():
 
     # 6. 如果用户选择了支票号或输入了有效支票号
     if cheque_input:
-        import re  # 引入正则表达式库，处理复杂字符串匹配
-        # **6.1 去掉前后空格并处理正则特殊字符**
+        # **6.1 去掉前后空格**
         cheque_input = cheque_input.strip()  # 去掉前后空格
-        pattern = re.escape(cheque_input)   # 转义正则特殊字符，确保特殊符号不会被误解释
 
-        # **6.2 执行精确匹配**
-        # - contains() 进行模糊查询，忽略大小写
-        # - na=False 确保 NaN 不会参与匹配
-        filtered = df[df['付款支票号'].astype(str).str.strip() == cheque_input]
+        # **6.2 执行精确匹配**：通过索引直接取出该支票号对应的所有行
+        filtered = lookup_rows(df, cheque_index, cheque_input)
 
         # 7. 检查是否找到匹配结果
         if filtered.empty:
@@ -63,9 +50,9 @@ def cheque_lookup_query():
             st.warning("❌ 支票号不存在或输入错误，请检查后重试。")
         else:
             # 8. 差额计算
-            # - 转换金额列为数值类型，非数值（如空值）用 0 填充
-            filtered['发票金额'] = pd.to_numeric(filtered['发票金额'], errors='coerce').fillna(0)
-            filtered['实际支付金额'] = pd.to_numeric(filtered['实际支付金额'], errors='coerce').fillna(0)
+            # - 金额列加载时已是整数“分”，空值用 0 填充
+            filtered['发票金额'] = filtered['发票金额'].fillna(0)
+            filtered['实际支付金额'] = filtered['实际支付金额'].fillna(0)
             filtered['差额'] = filtered['发票金额'] - filtered['实际支付金额']
 
             # 9. 格式化日期列
@@ -80,7 +67,7 @@ def cheque_lookup_query():
             # groupby().sum() 在 Pandas 中的默认行为，它会自动忽略列中的空值（NaN），而不是将结果直接设为 NaN
             # .reset_index() 将分组列（部门）从索引转换为普通列，使得结果可以作为一个独立的 DataFrame 返回，便于后续处理和展示
             # 此时 summary 已经变成了一个 DataFrame，包含部门、实际支付金额、TPS 和 TVQ 的总和
-            summary = filtered.groupby('部门')[['实际支付金额', 'TPS', 'TVQ']].sum().reset_index()
+            summary = filtered.groupby('部门', observed=True)[['实际支付金额', 'TPS', 'TVQ']].sum().reset_index()
             
             # - 添加总计行
             total_row = pd.DataFrame([{
@@ -95,23 +82,11 @@ def cheque_lookup_query():
             # ignore_index=True 会重新设置索引，而不是保留原有索引
             summary = pd.concat([summary, total_row], axis = 0, ignore_index=True)
 
-            # **10.1 定义总计行高亮函数**
-            def highlight_total(row):
-                # 当前行是否是“总计”行，设置背景颜色
-                if row['部门'] == '总计':
-                    # len(row)：获取当前行的列数
-                    return ['background-color: #FADBD8'] * len(row)
-                # 如果不是“总计”行，则返回一个空样式列表，不做任何样式设置。
-                return [''] * len(row)
-
             # 11. 显示部门汇总结果
             st.markdown("### 💰 查询结果：部门汇总")
             st.dataframe(
-                summary.style
-                # 在 Pandas 的 DataFrame.apply() 方法中，函数**highlight_total的调用方式与普通 Python 函数有所不同,不需要()显式传递参数,
-                # 主要原因是在 apply() 传递函数时，Pandas 会自动将每一行（axis=1）或每一列（axis=0）作为**Series传递给函数，因此highlight_total**不需要显式传递参数。
-                # highlight_total(row) 只接受一个参数，即**row**
-                .apply(highlight_total, axis=1) # axis=1 按行应用样式
+                # “总计”行设置背景颜色：按“部门”列整表一次性生成样式，不再逐行调用 Python 函数
+                highlight_summary_rows(display_amounts(summary), '部门', total_color='#FADBD8')
                 .format({
                     # ：格式说明符开始   , 启用千分位    .2f 保留两位小数
                     '实际支付金额': '{:,.2f}',
@@ -124,7 +99,7 @@ def cheque_lookup_query():
             # 12. 显示详细发票信息
             st.markdown("### 🧾 查询结果：详细发票信息")
             st.dataframe(
-                filtered[['部门', '公司名称', '发票号', '发票金额', '实际支付金额', 'TPS', 'TVQ', '差额', '发票日期', '开支票日期']]
+                display_amounts(filtered[['部门', '公司名称', '发票号', '发票金额', '实际支付金额', 'TPS', 'TVQ', '差额', '发票日期', '开支票日期']])
                 .style.format({
                     '发票金额': '{:,.2f}',
                     '实际支付金额': '{:,.2f}',
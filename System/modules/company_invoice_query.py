@@ -1,21 +1,27 @@
 import streamlit as st
 import pandas as pd
-from fonts.fonts import load_chinese_font
-from modules.data_loader import load_supplier_data
-
-my_font = load_chinese_font()
+from modules.data_loader import load_supplier_data, data_version
+from modules.lookup_index import load_company_index, search_companies, company_rows
+from ui.table_style import highlight_summary_rows
+from modules.table_builder import build_subtotal_table
+from modules.money import display_amounts
 
 def company_invoice_query():
     df = load_supplier_data()
 
     st.subheader("🏢 公司查询（支持不区分大小写模糊匹配+下拉选择）")
 
-    # ✅ 公司名选项（去重、排除空值）
-    all_companies = df['公司名称'].dropna().astype(str).unique().tolist()
-    sorted_companies = sorted([c for c in all_companies if c.strip()], key=lambda x: x.lower())
+    # ✅ 公司名称索引（每个数据版本只构建一次）：下拉选项（去重、排除空值、已排序）+ 三字母片段倒排索引
+    company_index = load_company_index(df, data_version(df))
+    sorted_companies = company_index['options']
 
-    # ✅ 用户输入或选择公司名称（自动提示 + 下拉）
-    keyword = st.selectbox("请输入或选择公司名称（支持模糊匹配和不区分大小写）:", options=[""] + sorted_companies, index=0)
+    # ✅ 用户输入或选择公司名称（自动提示 + 下拉）；允许输入不在列表中的关键字（部分名称 / 拼写有误）
+    keyword = st.selectbox(
+        "请输入或选择公司名称（支持模糊匹配和不区分大小写）:",
+        options=[""] + sorted_companies,
+        index=0,
+        accept_new_options=True,
+    )
 
     # ✅ 日期选择（发票日期）
     min_date, max_date = df['发票日期'].min(), df['发票日期'].max()
@@ -26,13 +32,18 @@ def company_invoice_query():
         end_date = st.date_input("结束日期", min_value=min_date, max_value=max_date, value=max_date)
 
     if keyword:
-        # ✅ 过滤公司名（模糊匹配 + 忽略大小写）
-        df_filtered = df[
-            df['公司名称'].astype(str).str.lower().str.contains(keyword.strip().lower()) &
-            (df['发票日期'] >= pd.to_datetime(start_date)) &
-            (df['发票日期'] <= pd.to_datetime(end_date))
+        # ✅ 过滤公司名（模糊匹配 + 忽略大小写）：先通过索引取出匹配公司的行，再只对这些行做日期筛选
+        company_ids, is_similar = search_companies(company_index, keyword)
+        df_company = company_rows(df, company_index, company_ids)
+        df_filtered = df_company[
+            (df_company['发票日期'] >= pd.to_datetime(start_date)) &
+            (df_company['发票日期'] <= pd.to_datetime(end_date))
         ].copy()
 
+        if is_similar and company_ids:
+            st.info("💡 没有公司名称包含“" + keyword.strip() + "”，已显示名称相近的公司：" +
+                    "、".join(df_company['公司名称'].astype(str).unique()))
+
         if df_filtered.empty:
             st.warning("未找到符合条件的发票数据，请检查公司名或日期范围。")
             return
@@ -48,38 +59,13 @@ def company_invoice_query():
         df_filtered = df_filtered.sort_values(by=['部门', '发票日期'])
 
         # ✅ 生成带有汇总行的表格
-        final_df = pd.DataFrame()
-        for dept, group in df_filtered.groupby('部门'):
-            final_df = pd.concat([final_df, group])
-            subtotal = group[['发票金额', '实际支付金额','TPS','TVQ', '差额']].sum().to_frame().T
-            subtotal['公司名称'] = keyword
-            subtotal['部门'] = f"{dept} 汇总"
-            subtotal['发票号'] = ''
-            subtotal['付款支票号'] = ''
-            subtotal['发票日期'] = ''
-            subtotal['开支票日期'] = ''
-            final_df = pd.concat([final_df, subtotal], ignore_index=True)
-
-        # ✅ 添加总计行
-        total = df_filtered[['发票金额', '实际支付金额', 'TPS','TVQ','差额']].sum().to_frame().T
-        total['公司名称'] = keyword
-        total['部门'] = '总计'
-        total['发票号'] = ''
-        total['付款支票号'] = ''
-        total['发票日期'] = ''
-        total['开支票日期'] = ''
-        final_df = pd.concat([final_df, total], ignore_index=True)
-
-        final_df = final_df[['公司名称', '部门', '发票号', '发票日期', '开支票日期', '付款支票号', '发票金额', '实际支付金额', 'TPS','TVQ','差额']]
-
-        # ✅ 着色
-        def highlight_summary(row):
-            if isinstance(row['部门'], str):
-                if row['部门'].endswith('汇总'):
-                    return ['background-color: #D6EAF8'] * len(row)
-                elif row['部门'] == '总计':
-                    return ['background-color: #FADBD8'] * len(row)
-            return [''] * len(row)
+        final_df = build_subtotal_table(
+            df_filtered,
+            group_col='部门',
+            sum_cols=['发票金额', '实际支付金额', 'TPS', 'TVQ', '差额'],
+            columns=['公司名称', '部门', '发票号', '发票日期', '开支票日期', '付款支票号', '发票金额', '实际支付金额', 'TPS', 'TVQ', '差额'],
+            fill={'公司名称': keyword, '发票号': '', '付款支票号': '', '发票日期': '', '开支票日期': ''},
+        )
 
         st.markdown("### 📋 查询结果：按部门分类显示")
 
@@ -91,8 +77,8 @@ def company_invoice_query():
 
 
         st.dataframe(
-            final_df.style
-            .apply(highlight_summary, axis=1)
+            # ✅ 着色：部门汇总行 浅蓝色，总计行 粉红色
+            highlight_summary_rows(display_amounts(final_df), '部门', subtotal_color='#D6EAF8', total_color='#FADBD8')
             .format({
                 '发票金额': '{:,.2f}',
                 '实际支付金额': '{:,.2f}',
@@ -1,25 +1,39 @@
 import pandas as pd
 import streamlit as st
 
-# 加载数据函数，设置缓存时间为 10 秒
-@st.cache_data(ttl=3600)
+from modules.data_sources import make_fetcher
+from modules.incremental_ingest import HIDDEN_COLUMNS, full_ingest, incremental_ingest
+from modules.natural_sort import NATURAL_SORT_COLUMNS, add_natural_sort_keys
+from modules.schema import SUPPLIER_SCHEMA, apply_schema, validate_schema, memory_footprint_mb
+from modules.money import to_cents
+from modules.snapshot_store import load_with_snapshot
 
-def load_supplier_data():
-    # Google Sheet 文件的 ID（你提供的链接）
-    file_id = "1qH_odKEPlDrLTM8B8UfsMzW6Uu9ciDUW"
+# 数据来源（Google Sheets / 本地 CSV、XLSX / SQLite）由 modules/data_sources.py 的配置决定，
+# 无论来自哪个后端，都统一经过下面的清洗流程
+
+# ✅ 增量导入模式：只清洗新增/变化的行，其余行复用本地快照（设为 False 则每次全量清洗）
+INCREMENTAL_INGEST = True
 
-    # Google Sheet 的 CSV 导出地址
-    csv_url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv"
+# ✅ 供应商数据清洗规则版本：清洗结果的列或类型发生变化时加 1，旧的本地快照会自动作废并全量重建
+#   2：新增 付款支票号 / 发票号 的自然排序键列
+#   3：按 modules/schema.py 的 SUPPLIER_SCHEMA 保存列类型（category / Arrow 字符串 / float64 / datetime64）
+#   4：金额改为以“分”为单位的整数（Int64）
+#   5：日期按 format='mixed' 逐个解析（增量清洗部分行时与全量清洗结果一致）
+SUPPLIER_SCHEMA_VERSION = 5
 
-    # 读取 CSV 数据（从 Google Sheets）
-    df = pd.read_csv(csv_url)
-    df = df.dropna(how='all')
+# ✅ 现金账数据清洗规则版本（含义同上）
+#   1：金额改为以“分”为单位的整数（Int64）
+CASH_SCHEMA_VERSION = 1
 
+
+def clean_supplier_frame(df):
     # 自动转换常用日期字段为 datetime 类型（可按需扩展）
+    # - format='mixed'：每个值单独识别格式。不指定格式时 pandas 会按第一个值推断整列格式，
+    #   增量导入只清洗变化的行，推断结果会随“哪些行变化”而不同，与全量清洗不一致
     date_columns = ['开支票日期', '发票日期','银行对账日期']
     for col in date_columns:
         if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+            df[col] = pd.to_datetime(df[col], errors='coerce', format='mixed')
 
     # 强制转换为字符串以避免 Streamlit 警告
     string_columns = ['付款支票号', '发票号', '公司名称']
@@ -27,22 +41,68 @@ def load_supplier_data():
         if col in df.columns:
             df[col] = df[col].astype(str)
 
+    # 金额统一换算为“分”（Int64 整数），之后的加减、汇总都是精确的整数运算
+    for col in ['发票金额', 'TPS', 'TVQ', '实际支付金额', '付款支票总额']:
+        if col in df.columns:
+            df[col] = to_cents(df[col])
+
+    # 支票号 / 发票号 自然排序键（前缀 + 数字两列），各页面排序时直接使用，不再逐行解析
+    for col in NATURAL_SORT_COLUMNS:
+        if col in df.columns:
+            add_natural_sort_keys(df, col)
+
     return df
 
 
-def load_cash_data():
-    # Google Sheet 文件的 ID（你提供的链接）
-    file_id = "1U6Xx5mhzCkjd6l4UQ7rOjFq4WQkNpQEK"
+def build_supplier_frame(raw, previous=None):
+    raw = raw.dropna(how='all')
+
+    if INCREMENTAL_INGEST:
+        df, report = incremental_ingest(raw, previous, clean_supplier_frame)
+    else:
+        df, report = full_ingest(raw, clean_supplier_frame)
 
-    # Google Sheet 的 CSV 导出地址
-    csv_url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv"
+    # ✅ 合并后统一转换为声明的列类型（增量合并时新旧两部分的分类编码不同，必须在合并之后再转换）
+    df = apply_schema(df, SUPPLIER_SCHEMA)
+    # 类型不一致的列随导入报告写入快照元数据，在侧边栏提示
+    problems = validate_schema(df, SUPPLIER_SCHEMA)
+    if problems:
+        report['类型问题'] = problems
+    report['内存MB'] = memory_footprint_mb(df)
 
-    # 读取 CSV 数据（从 Google Sheets）
-    df_data = pd.read_csv(csv_url)
+    return df, {"ingest_report": report}
 
 
-    # ✅ 步骤 1：读取 Excel 文件
-    df_data = df_data.dropna(how='all')  # 删除完全为空的行
+# 加载数据函数，设置缓存时间为 1 小时
+# ✅ 缓存失效后不再直接重新解析整张表：
+#    数据源未变化时直接内存映射读取本地 Feather 快照，只有数据真正变化时才重新解析
+@st.cache_data(ttl=3600)
+
+def load_supplier_data():
+    df = load_with_snapshot(
+        "supplier", make_fetcher("supplier"), build_supplier_frame, schema_version=SUPPLIER_SCHEMA_VERSION
+    )
+    # 去掉仅供增量比较使用的行键/行哈希列
+    return df.drop(columns=HIDDEN_COLUMNS, errors='ignore')
+
+
+def data_version(df):
+    """
+    返回数据版本号：加载时写在 df.attrs['data_version'] 中，数据源内容变化时才会改变。
+    各页面用它作为 @st.cache_data 派生结果的缓存键，避免每次都对整张表做哈希：
+    派生函数写成 f(_df, version, ...)，参数名以下划线开头的 _df 不参与 Streamlit 的哈希，
+    由 version（以及其余参数）决定缓存键；数据更新后版本号改变，旧的派生结果自动失效。
+    """
+    version = df.attrs.get('data_version')
+    if version is None:
+        # 兜底：没有版本号时（例如未写快照），按内容计算一次
+        version = str(pd.util.hash_pandas_object(df, index=True).sum())
+    return version
+
+
+def clean_cash_frame(df_data):
+    # ✅ 步骤 1：删除完全为空的行
+    df_data = df_data.dropna(how='all')
 
     # ✅ 步骤 2：统一日期和金额格式
     df_data['小票日期'] = pd.to_datetime(df_data['小票日期'], errors='coerce').dt.strftime('%Y-%m-%d')  # 格式化为 yyyy-mm-dd 字符串
@@ -53,11 +113,11 @@ def load_cash_data():
 
     # ✅ 保留“开票日期”非空的数据
     #df_data = df_data[df_data['开票日期'].notna()]
-    df_data = df_data[df_data['会计核算日期'].notna()]
+    df_data = df_data[df_data['会计核算日期'].notna()].copy()
 
-    # ✅ 金额字段转换为浮点并保留两位小数
+    # ✅ 金额字段换算为“分”（Int64 整数，精确到分，不再需要 round(2)）
     for col in ['总金额', 'TPS', 'TVQ', '支票金额']:
-        df_data[col] = pd.to_numeric(df_data[col], errors='coerce').round(2)
+        df_data[col] = to_cents(df_data[col])
 
     # ✅ 步骤 3：添加“年月”列（格式：2025-02）
     #df_data['年月'] = df_data['开票日期'].dt.to_period('M').astype(str)
@@ -77,3 +137,14 @@ def load_cash_data():
             df_data[col] = df_data[col].astype(str)
 
     return df_data
+
+
+def build_cash_frame(raw, previous=None):
+    return clean_cash_frame(raw), {}
+
+
+# 现金账数据与供应商数据走同样的 数据源 → 清洗 → 本地快照 流程
+@st.cache_data(ttl=3600)
+
+def load_cash_data():
+    return load_with_snapshot("cash", make_fetcher("cash"), build_cash_frame, schema_version=CASH_SCHEMA_VERSION)
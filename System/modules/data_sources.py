@@ -0,0 +1,122 @@
+# 📁 modules/data_sources.py
+# 数据源抽象：供应商数据 / 现金账数据可以来自
+#   - remote_csv ：Google Sheets 等远程 CSV 导出地址（默认）
+#   - local_file ：本地 CSV / XLSX 文件（例如月末结账时的本地镜像）
+#   - sqlite     ：本地 SQLite 数据库中的一张表
+# 具体使用哪个后端由配置决定，所有后端都返回“未清洗”的原始 DataFrame，
+# 之后统一走 data_loader 中相同的清洗流程。
+import hashlib
+import io
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from modules.snapshot_store import fetch_if_changed
+
+SYSTEM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 可选配置文件：存在时覆盖下面的默认配置（格式参考 data_sources.example.json）
+CONFIG_PATH = os.path.join(SYSTEM_DIR, "data_sources.json")
+
+# 默认配置：与原来硬编码的 Google Sheets 地址一致
+DEFAULT_DATA_SOURCES = {
+    "supplier": {
+        "backend": "remote_csv",
+        "url": "https://docs.google.com/spreadsheets/d/1qH_odKEPlDrLTM8B8UfsMzW6Uu9ciDUW/export?format=csv",
+    },
+    "cash": {
+        "backend": "remote_csv",
+        "url": "https://docs.google.com/spreadsheets/d/1U6Xx5mhzCkjd6l4UQ7rOjFq4WQkNpQEK/export?format=csv",
+    },
+}
+
+
+def get_source_config(name):
+    """
+    读取数据源配置，优先级：环境变量 > data_sources.json > 默认配置
+    环境变量示例（name=supplier）：
+      XY_SUPPLIER_BACKEND=local_file  XY_SUPPLIER_PATH=D:/mirror/supplier.xlsx
+      XY_SUPPLIER_BACKEND=sqlite      XY_SUPPLIER_PATH=D:/mirror/xinya.db  XY_SUPPLIER_TABLE=supplier
+    """
+    config = dict(DEFAULT_DATA_SOURCES.get(name, {}))
+
+    if os.path.exists(CONFIG_PATH):
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            config.update(json.load(f).get(name, {}))
+
+    prefix = f"XY_{name.upper()}_"
+    for key in ["backend", "url", "path", "table", "sheet"]:
+        value = os.environ.get(prefix + key.upper())
+        if value:
+            config[key] = value
+
+    # 相对路径一律相对于 System 目录，而不是当前工作目录
+    if config.get("path") and not os.path.isabs(config["path"]):
+        config["path"] = os.path.join(SYSTEM_DIR, config["path"])
+    return config
+
+
+# -------------------------------
+# 各后端实现
+# 统一接口：fetch(config, meta) -> (原始 DataFrame 或 None, 新元数据)
+# 返回 None 表示数据自上次以来没有变化；新元数据中的 version 用作数据版本号
+# -------------------------------
+
+def fetch_remote_csv(config, meta):
+    payload, new_meta = fetch_if_changed(config["url"], meta)
+    new_meta["version"] = new_meta.get("sha256")
+    if payload is None:
+        return None, new_meta
+    return pd.read_csv(io.BytesIO(payload)), new_meta
+
+
+def fetch_local_file(config, meta):
+    path = config["path"]
+    with open(path, "rb") as f:
+        payload = f.read()
+
+    sha256 = hashlib.sha256(payload).hexdigest()
+    new_meta = {"path": path, "sha256": sha256, "version": sha256}
+    if sha256 == meta.get("sha256"):
+        return None, new_meta
+
+    if path.lower().endswith((".xlsx", ".xls")):
+        raw = pd.read_excel(io.BytesIO(payload), sheet_name=config.get("sheet", 0))
+    else:
+        raw = pd.read_csv(io.BytesIO(payload))
+    return raw, new_meta
+
+
+def fetch_sqlite(config, meta):
+    path = config["path"]
+    table = config.get("table", "data")
+
+    # 数据库文件较大时不做整体哈希，用 修改时间 + 文件大小 作为指纹
+    stat = os.stat(path)
+    fingerprint = f"{stat.st_mtime_ns}-{stat.st_size}-{table}"
+    new_meta = {"path": path, "table": table, "version": fingerprint}
+    if fingerprint == meta.get("version"):
+        return None, new_meta
+
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+        raw = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+    return raw, new_meta
+
+
+BACKENDS = {
+    "remote_csv": fetch_remote_csv,
+    "local_file": fetch_local_file,
+    "sqlite": fetch_sqlite,
+}
+
+
+def make_fetcher(name):
+    """按配置返回该数据源的 fetch(meta) 函数"""
+    config = get_source_config(name)
+    backend = config.get("backend", "remote_csv")
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的数据源后端：{backend}（可选：{', '.join(BACKENDS)}）")
+    fetch = BACKENDS[backend]
+    return lambda meta: fetch(config, meta)
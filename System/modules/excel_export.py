@@ -0,0 +1,44 @@
+# 📁 modules/excel_export.py
+# Excel 导出（流式写入）：
+#   - xlsxwriter 的 constant_memory 模式：按行顺序写出，每写完一行就落到临时文件，
+#     内存占用不随行数增长（pandas 的 to_excel 会先在内存中建好整本工作簿）
+#   - 数字格式按列一次性设置（set_column），不逐个单元格格式化
+#   - 页面上 st.download_button 的 data 传入函数：只有用户点击下载时才生成文件，
+#     平时页面刷新不再生成 Excel
+import io
+
+import xlsxwriter
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 金额列的数字格式（保留两位小数）
+MONEY_FORMAT = '0.00'
+
+
+def dataframe_to_xlsx(df, sheet_name='Sheet1', money_columns=()):
+    """把 DataFrame 流式写成 xlsx，返回文件内容（bytes）；money_columns 中的列按两位小数显示"""
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd',
+        'remove_timezone': True,
+    })
+    worksheet = workbook.add_worksheet(sheet_name)
+
+    # 表头加粗，金额列整列设置数字格式
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+    money_format = workbook.add_format({'num_format': MONEY_FORMAT})
+    for position, col in enumerate(df.columns):
+        if col in money_columns:
+            worksheet.set_column(position, position, None, money_format)
+
+    worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+
+    # 空值（NaN / NaT / <NA>）统一转为 None，写出时为空单元格
+    values = df.astype(object).where(df.notna(), None)
+    for row_number, row in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_number, 0, row)
+
+    workbook.close()
+    return buffer.getvalue()
+
@@ -0,0 +1,70 @@
+# 📁 modules/export_service.py
+# 导出服务（各查询页面共用）：把页面上的结果表编码为 Excel / CSV / Parquet
+#   - Excel：流式写入（见 modules/excel_export.py）
+#   - CSV：UTF-8 带 BOM，Excel 直接打开中文不乱码
+#   - Parquet：列式二进制格式，记账工具导入速度远快于 xlsx
+# 编码结果按“表内容哈希 + 格式”缓存：同一份结果重复下载（或不同页面导出相同内容）只编码一次
+import hashlib
+import io
+
+import pandas as pd
+import streamlit as st
+
+from modules.excel_export import dataframe_to_xlsx, XLSX_MIME
+
+# 格式名 → (扩展名, MIME 类型)
+EXPORT_FORMATS = {
+    'Excel': ('xlsx', XLSX_MIME),
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+# 缓存的编码结果个数（超出后淘汰最久未使用的）
+EXPORT_CACHE_SIZE = 16
+
+
+def content_hash(df):
+    """表内容哈希（列名、列类型 + 按顺序的每行内容），内容和行顺序都相同的表才得到相同的哈希"""
+    digest = hashlib.sha1()
+    digest.update('\x1f'.join(f"{c}:{df[c].dtype}" for c in df.columns).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def parquet_ready(df):
+    """
+    Parquet 每列只能有一种类型：汇总行里的 '' 与数字混在同一列时，
+    把这类混合列转为文字（空值保持为空），其余列原样保留
+    """
+    mixed = [
+        col for col in df.columns
+        if df[col].dtype == object
+        and pd.api.types.infer_dtype(df[col], skipna=True) not in ('string', 'empty')
+    ]
+    if not mixed:
+        return df
+    return df.assign(**{col: df[col].where(df[col].isna(), df[col].astype(str)) for col in mixed})
+
+
+def encode_frame(df, fmt, sheet_name='Sheet1', money_columns=()):
+    """把 DataFrame 编码为指定格式的文件内容（bytes）"""
+    if fmt == 'Excel':
+        return dataframe_to_xlsx(df, sheet_name=sheet_name, money_columns=money_columns)
+    if fmt == 'CSV':
+        return df.to_csv(index=False).encode('utf-8-sig')
+    if fmt == 'Parquet':
+        buffer = io.BytesIO()
+        parquet_ready(df).to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    raise ValueError(f"不支持的导出格式：{fmt}")
+
+
+# 缓存键是内容哈希 digest（而不是数据版本号）：不同页面导出相同内容的表时共用一次编码
+@st.cache_data(max_entries=EXPORT_CACHE_SIZE, show_spinner=False)
+def _encode_cached(_df, digest, fmt, sheet_name, money_columns):
+    return encode_frame(_df, fmt, sheet_name=sheet_name, money_columns=money_columns)
+
+
+def export_bytes(df, fmt, sheet_name='Sheet1', money_columns=()):
+    """编码并缓存（按内容哈希去重）"""
+    return _encode_cached(df, content_hash(df), fmt, sheet_name, tuple(money_columns))
@@ -0,0 +1,78 @@
+# 📁 modules/figure_budget.py
+# 图表数据量预算（各图表页面共用）：
+# st.plotly_chart 会把图表的每个点（以及每个点的金额标签 text）序列化后发送到浏览器，
+# 历史数据越多，按部门的月度折线图、柱状图 / 饼图就越大，序列化和浏览器渲染都越慢。这里统一控制：
+#   - 系列预算：单独显示的部门数不超过 MAX_SERIES，且 部门数 × x 轴点数 不超过 MAX_POINTS；
+#     超出预算时金额较小的部门合并为“其他”（金额相加，合计不变）
+#   - 标签预算：图上的点数超过 MAX_TEXT_LABELS 时不再显示每个点的金额标签（hover 中仍可查看金额）
+#   - 图表 JSON 按“图表名 + 筛选状态”缓存：筛选条件不变时页面刷新不再重新构建图表
+# plotly 只在构建图表时才 import（页面模块按需加载，见 ui/page_registry.py）
+import pandas as pd
+import streamlit as st
+
+MAX_SERIES = 12          # 最多单独显示的部门数（含“其他”）
+MAX_POINTS = 600         # 一张图最多的点数（部门数 × x 轴点数）
+MAX_TEXT_LABELS = 60     # 点数不超过该值时才在每个点上显示金额标签
+OTHER_LABEL = '其他'
+OTHER_COLOR = '#CCCCCC'
+
+# 缓存的图表个数（超出后淘汰最久未使用的）
+FIGURE_CACHE_SIZE = 32
+
+
+def series_budget(n_points, max_series=MAX_SERIES, max_points=MAX_POINTS):
+    """x 轴有 n_points 个点时，最多单独显示的系列数（至少 2 个：最大的部门 + 其他）"""
+    return max(2, min(max_series, max_points // max(n_points, 1)))
+
+
+def limit_series(df, value_cols, x_cols=(), series_col='部门', max_series=MAX_SERIES, max_points=MAX_POINTS):
+    """
+    系列数超出预算时，按 value_cols[0] 的合计（绝对值）保留最大的几个部门，其余合并为 OTHER_LABEL：
+    - x_cols：x 轴相关的列（如 ['月份']），合并后按 x_cols + 部门 重新汇总 value_cols
+    - 只保留 x_cols + 部门 + value_cols 这些列；未超出预算时原样返回
+    """
+    x_cols = list(x_cols)
+    n_points = df[x_cols[0]].nunique() if x_cols else 1
+    budget = series_budget(n_points, max_series, max_points)
+    if df[series_col].nunique() <= budget:
+        return df
+
+    totals = df.groupby(series_col, observed=True)[value_cols[0]].sum().abs()
+    kept = totals.nlargest(budget - 1).index
+    series = df[series_col].astype(object)
+    merged = df.assign(**{series_col: series.where(series.isin(kept), OTHER_LABEL)})
+
+    out = merged.groupby(x_cols + [series_col], sort=False)[value_cols].sum().reset_index()
+    # x 轴按原顺序排列，同一个 x 上“其他”排在最后
+    out['_其他'] = out[series_col] == OTHER_LABEL
+    return out.sort_values(x_cols + ['_其他'], kind='stable').drop(columns='_其他').reset_index(drop=True)
+
+
+def with_other_color(color_map):
+    """部门颜色映射中加入“其他”的颜色（灰色）"""
+    return {**color_map, OTHER_LABEL: OTHER_COLOR}
+
+
+def point_labels(values, max_labels=MAX_TEXT_LABELS):
+    """每个点的金额标签（取整）；点数超过预算时返回 None，即不显示标签"""
+    if len(values) > max_labels:
+        return None
+    return pd.Series(values).round(0).astype(int).to_numpy()
+
+
+# 缓存键是 图表名 name + 筛选状态 state：state 必须包含 build 用到的所有筛选条件（数据版本、所选月份、日期范围等），
+# 否则筛选变化后仍会命中旧图表
+@st.cache_data(max_entries=FIGURE_CACHE_SIZE, show_spinner=False)
+def _figure_json(_build, name, state):
+    import plotly.io as pio
+    return pio.to_json(_build(), validate=False)
+
+
+def cached_figure(name, state, build):
+    """
+    - name：图表名（页面内唯一）
+    - state：决定图表内容的筛选状态（可哈希，如 (数据版本, 所选月份)）
+    - build：无参函数，返回 plotly Figure（只在缓存未命中时调用）
+    """
+    import plotly.io as pio
+    return pio.from_json(_figure_json(build, name, state))
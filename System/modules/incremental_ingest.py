@@ -0,0 +1,88 @@
+# 📁 modules/incremental_ingest.py
+# 增量导入：供应商表只会追加新发票/支票，旧行偶尔补上“银行对账日期”。
+# 因此按 (发票号, 公司名称, 付款支票号) 给每一行生成行键，并对整行内容做哈希，
+# 只对“新增”或“内容有变化”的行重新做清洗，其余行直接复用上一次快照中已清洗好的结果。
+import numpy as np
+import pandas as pd
+
+# 行键字段
+KEY_COLUMNS = ['发票号', '公司名称', '付款支票号']
+
+# 快照中额外保存的两列（加载完成后会被去掉，不会出现在页面上）
+ROW_KEY_COL = '_行键'
+ROW_HASH_COL = '_行哈希'
+HIDDEN_COLUMNS = [ROW_KEY_COL, ROW_HASH_COL]
+
+
+def compute_row_keys(raw):
+    """按行键字段生成 uint64 行键；同一键重复出现时，用出现次序区分（第 1 次、第 2 次……）"""
+    key_frame = raw.reindex(columns=KEY_COLUMNS).astype(str)
+    base = pd.util.hash_pandas_object(key_frame, index=False)
+    occurrence = base.groupby(base.values).cumcount()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({'键': base.values, '次序': occurrence.values}), index=False
+    ).values
+
+
+def compute_row_hashes(raw):
+    """对整行原始内容做哈希，用于判断行是否发生变化"""
+    return pd.util.hash_pandas_object(raw, index=False).values
+
+
+def full_ingest(raw, clean_func):
+    """全量导入：清洗全部行，并附上行键与行哈希，供下一次增量比较"""
+    df = clean_func(raw.copy())
+    df[ROW_KEY_COL] = compute_row_keys(raw)
+    df[ROW_HASH_COL] = compute_row_hashes(raw)
+    report = {'新增': len(df), '更新': 0, '未变化': 0, '删除': 0, '模式': '全量'}
+    return df.reset_index(drop=True), report
+
+
+def incremental_ingest(raw, previous, clean_func):
+    """
+    增量导入：
+    - raw：本次读取的原始表（尚未清洗）
+    - previous：上一次快照（已清洗，并带有行键/行哈希两列），为空时退回全量导入
+    - clean_func：与全量加载相同的清洗函数，只作用于新增/变化的行
+    返回 (合并后的 DataFrame, 统计报告)
+    """
+    if previous is None:
+        return full_ingest(raw, clean_func)
+
+    # 清洗后的列（包括清洗时派生出的列，如排序键），用空表试算一次即可得到
+    expected_columns = list(clean_func(raw.iloc[:0].copy()).columns) + HIDDEN_COLUMNS
+    if list(previous.columns) != expected_columns:
+        # 表头发生变化（新增/删除列，或清洗规则新增了派生列），只能全量重建
+        return full_ingest(raw, clean_func)
+
+    keys = compute_row_keys(raw)
+    hashes = compute_row_hashes(raw)
+
+    # 在上一次快照中查找每个行键的位置（-1 表示新增行）
+    previous_positions = pd.Index(previous[ROW_KEY_COL].values).get_indexer(keys)
+    is_new = previous_positions < 0
+    previous_hashes = previous[ROW_HASH_COL].values[np.where(is_new, 0, previous_positions)]
+    is_unchanged = ~is_new & (previous_hashes == hashes)
+    is_changed = ~is_new & ~is_unchanged
+
+    # 未变化的行：直接复用快照中的清洗结果
+    reused = previous.iloc[previous_positions[is_unchanged]]
+
+    # 新增/变化的行：只清洗这一部分
+    fresh = clean_func(raw[~is_unchanged].copy())
+    fresh[ROW_KEY_COL] = keys[~is_unchanged]
+    fresh[ROW_HASH_COL] = hashes[~is_unchanged]
+
+    # 按本次原始表的行顺序拼回去
+    order = np.concatenate([np.flatnonzero(is_unchanged), np.flatnonzero(~is_unchanged)])
+    merged = pd.concat([reused, fresh], ignore_index=True)
+    merged = merged.iloc[np.argsort(order, kind='stable')].reset_index(drop=True)
+
+    report = {
+        '新增': int(is_new.sum()),
+        '更新': int(is_changed.sum()),
+        '未变化': int(is_unchanged.sum()),
+        '删除': int(len(previous) - (~is_new).sum()),
+        '模式': '增量',
+    }
+    return merged, report
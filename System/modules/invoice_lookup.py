@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
-from modules.data_loader import load_supplier_data
+from modules.data_loader import load_supplier_data, data_version
+from modules.lookup_index import load_invoice_index, lookup_rows
+from ui.table_style import highlight_summary_rows
+from modules.money import display_amounts
 
 
 def invoice_lookup_query():
@@ -10,18 +13,11 @@ def invoice_lookup_query():
     # 📝 设置页面标题
     st.subheader("🧾 发票号查询（支持精确匹配和下拉选择）")
 
-    # ✅ 预处理发票号列表，去除空值并转换为字符串类型
-    # 将所有发票号转换为字符串，去除空值，并获取唯一值
-    all_invoice_ids = df['发票号'].dropna().astype(str).unique().tolist()
-
-    # ✅ 将发票号分为数字和非数字两类，并分别排序
-    # 数字发票号按数值排序
-    numeric_ids = sorted([x for x in all_invoice_ids if x.isdigit()], key=lambda x: int(x))
-    # 非数字发票号按字母顺序排序
-    text_ids = sorted([x for x in all_invoice_ids if not x.isdigit()])
-
-    # ✅ 合并数字和文本发票号，确保数字在前
-    all_sorted_invoice_ids = numeric_ids + text_ids
+    # ✅ 发票号索引（每个数据版本只构建一次）
+    # - options：去除空值后的发票号，数字在前按数值排序，文本在后按字母排序
+    # - positions：发票号（去前后空格）→ 行位置，用于精确查询
+    invoice_index = load_invoice_index(df, data_version(df))
+    all_sorted_invoice_ids = invoice_index['options']
 
     # ✅ 选择框（支持精确匹配）
     # 提供一个带有下拉选项和输入框的组合控件
@@ -35,7 +31,7 @@ def invoice_lookup_query():
     # ✅ 检查用户是否输入了发票号
     if invoice_input:
         # 🔎 过滤数据，仅保留完全匹配的发票号
-        filtered = df[df['发票号'].astype(str).str.strip() == invoice_input.strip()]
+        filtered = lookup_rows(df, invoice_index, invoice_input)
 
         # ❌ 如果没有找到匹配结果，提示用户
         if filtered.empty:
@@ -79,18 +75,14 @@ def invoice_lookup_query():
                 # 🔗 将汇总行添加到结果表格中
                 filtered = pd.concat([filtered, summary_row], ignore_index=True)
 
-            # 🎨 自定义样式函数（设置汇总行背景颜色）
-            def highlight_summary(row):
-                # 如果该行是汇总行，则设置淡红色背景
-                if has_summary_row and row['发票号'] == '汇总':
-                    return ['background-color: #f8d7da'] * len(row)
-                # 否则不设置背景颜色
-                return [''] * len(row)
-
             # 📋 显示结果表格
             # 使用 Pandas Styler 设置表格格式和样式
             st.dataframe(
-                filtered[display_cols].style.apply(highlight_summary, axis=1).format({
+                # 🎨 如果添加了汇总行（发票号 = '汇总'），则设置淡红色背景
+                highlight_summary_rows(
+                    display_amounts(filtered[display_cols]), '发票号',
+                    total_color='#f8d7da' if has_summary_row else None, total_label='汇总',
+                ).format({
                     '发票金额': '{:,.2f}',
                     '实际支付金额': '{:,.2f}',
                     'TPS': '{:,.2f}',
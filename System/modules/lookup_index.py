@@ -0,0 +1,134 @@
+# 📁 modules/lookup_index.py
+# 支票号 / 发票号 查询索引（每个数据版本只构建一次）：
+#   - positions：{规范化后的号码（去前后空格的字符串）: 对应行位置数组}，查询时 O(1) 取行，不再对整列做字符串比较
+#   - options  ：已经按自然顺序排好序的下拉选项（使用加载时算好的排序键，见 natural_sort.py）
+# 索引是只读对象，用 st.cache_resource 在所有会话之间共享同一份，每次重跑不需要复制或反序列化。
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.natural_sort import natural_sort_columns, natural_sorted
+
+
+def build_positions(values):
+    """{去掉前后空格的字符串号码: 行位置数组（与原表行顺序一致）}"""
+    keys = pd.Series(values).astype(str).str.strip().to_numpy()
+    return pd.Series(np.arange(len(keys))).groupby(keys, sort=False).indices
+
+
+def sorted_options(df, name):
+    """name 列去重后的号码，按自然顺序排列（纯数字在前按数值，其余按 前缀 + 数字）"""
+    unique_rows = df[natural_sort_columns(name)].drop_duplicates(subset=name)
+    return natural_sorted(unique_rows, name)[name].astype(str).tolist()
+
+
+def lookup_rows(df, index, value):
+    """按号码取出对应的行（找不到时返回空表）"""
+    positions = index['positions'].get(str(value).strip(), np.array([], dtype=np.intp))
+    return df.iloc[positions]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_cheque_index(_df, version):
+    """支票号索引：下拉选项排除空白支票号"""
+    cheques = _df[_df['付款支票号'].notna() & (_df['付款支票号'].astype(str).str.strip() != '')]
+    return {
+        'positions': build_positions(_df['付款支票号']),
+        'options': sorted_options(cheques, '付款支票号'),
+    }
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_invoice_index(_df, version):
+    """发票号索引：下拉选项排除空值"""
+    return {
+        'positions': build_positions(_df['发票号']),
+        'options': sorted_options(_df[_df['发票号'].notna()], '发票号'),
+    }
+
+
+# -------------------------------
+# 公司名称模糊查询索引（trigram 三字母片段倒排索引）
+#   - 公司名称统一转小写后去重，每个公司名称对应它在原表中的行位置
+#   - 每个三字母片段 → 包含该片段的公司编号；查询时先用片段求交集缩小候选，再做子串确认
+#   - 没有任何公司包含关键字时，按片段相似度返回相近的公司（容错：拼写错误、少字母等）
+# 查询开销只与候选公司数量及其行数有关，不再对整列 公司名称 做 str.contains
+# -------------------------------
+
+def trigrams(text):
+    """字符串的三字母片段集合（不足 3 个字符时为空集）"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def build_company_index(companies):
+    """构建公司名称索引：names（小写公司名）、positions（各公司的行位置）、grams（片段 → 公司编号数组）"""
+    lowered = pd.Series(companies).astype(str).str.lower().to_numpy()
+    positions = pd.Series(np.arange(len(lowered))).groupby(lowered, sort=False).indices
+    names = list(positions)
+
+    grams = {}
+    for name_id, name in enumerate(names):
+        for gram in trigrams(name):
+            grams.setdefault(gram, []).append(name_id)
+
+    return {
+        'names': names,
+        'positions': [positions[name] for name in names],
+        'grams': {gram: np.array(ids) for gram, ids in grams.items()},
+    }
+
+
+def search_companies(index, keyword, min_similarity=0.3):
+    """
+    查询公司编号（不区分大小写）：
+    - 优先返回名称中包含关键字的公司（子串匹配）
+    - 若没有，则返回片段相似度（Jaccard）>= min_similarity 的相近公司
+    返回 (公司编号列表, 是否为相近匹配)
+    """
+    keyword = keyword.strip().lower()
+    names = index['names']
+    query_grams = trigrams(keyword)
+
+    if query_grams:
+        postings = [index['grams'].get(gram) for gram in query_grams]
+        if any(p is None for p in postings):
+            candidates = []
+        else:
+            candidates = postings[0]
+            for p in postings[1:]:
+                candidates = np.intersect1d(candidates, p, assume_unique=True)
+    else:
+        # 关键字太短（不足 3 个字符）无法使用片段索引，直接在去重后的公司名称中查找
+        candidates = range(len(names))
+
+    matched = [int(i) for i in candidates if keyword in names[i]]
+    if matched or not query_grams:
+        return matched, False
+
+    # 容错匹配：统计每个公司命中的片段数，计算相似度
+    hits = {}
+    for gram in query_grams:
+        for name_id in index['grams'].get(gram, ()):
+            hits[name_id] = hits.get(name_id, 0) + 1
+    similar = [
+        int(name_id) for name_id, count in hits.items()
+        if count / len(query_grams | trigrams(names[name_id])) >= min_similarity
+    ]
+    return sorted(similar), True
+
+
+def company_rows(df, index, company_ids):
+    """取出指定公司的所有行（保持原表行顺序）"""
+    if not company_ids:
+        return df.iloc[0:0]
+    positions = np.sort(np.concatenate([index['positions'][i] for i in company_ids]))
+    return df.iloc[positions]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_company_index(_df, version):
+    """公司名称索引 + 下拉选项（去重、排除空值，按不区分大小写的字母顺序排序）"""
+    all_companies = _df['公司名称'].dropna().astype(str).unique().tolist()
+    index = build_company_index(_df['公司名称'])
+    index['options'] = sorted([c for c in all_companies if c.strip()], key=lambda x: x.lower())
+    return index
@@ -0,0 +1,62 @@
+# 📁 modules/money.py
+# 金额统一以“分”为单位的整数（Int64，可为空）保存和计算：
+#   - 加减、求和、分组汇总都是精确的整数运算，不再有 0.1 + 0.2 之类的浮点误差，
+#     “应付未付额 != 0” 这类判断也不会被 0.0000001 的尾差干扰
+#   - 页面上不再需要到处 .round(2)；只有在显示 / 导出 / 画图时才换算回“元”
+import numpy as np
+import pandas as pd
+
+CENTS_PER_UNIT = 100
+
+# 以“分”保存的金额列（包括各页面派生出的金额列），显示时按列名统一换算
+MONEY_COLUMNS = [
+    '发票金额', 'TPS', 'TVQ', '实际支付金额', '付款支票总额', '总金额', '支票金额', '净值',
+    '差额', '实际差额', '应付未付差额', '应付未付额AP', '银行实际支付金额', '税后金额', 'Hors Taxes',
+]
+
+
+def to_cents(values):
+    """元 → 分（Int64）；无法识别的值和空值为 <NA>"""
+    amounts = pd.to_numeric(pd.Series(values), errors='coerce')
+    return (amounts * CENTS_PER_UNIT).round().astype('Int64')
+
+
+def from_cents(values):
+    """分 → 元（float64）；空值为 NaN，可以直接用 '{:,.2f}' 格式化或画图"""
+    cents = pd.Series(values)
+    return pd.Series(
+        cents.to_numpy(dtype='float64', na_value=np.nan) / CENTS_PER_UNIT,
+        index=cents.index,
+        name=cents.name,
+    )
+
+
+def cents_array(values, fill=0):
+    """分 → numpy int64 数组（空值按 fill 计算），用于 np.where 等向量化运算"""
+    return pd.Series(values).astype('Int64').fillna(fill).to_numpy(dtype=np.int64)
+
+
+def display_amounts(df, columns=None):
+    """返回副本：金额列从“分”换算为“元”（只在显示 / 导出 / 画图前调用）"""
+    columns = [c for c in (columns or MONEY_COLUMNS) if c in df.columns]
+    if not columns:
+        return df
+    return df.assign(**{c: from_cents(df[c]) for c in columns})
+
+
+def format_amount(cents):
+    """单个金额（分）→ '1,234.56' 形式的字符串（用于提示文字）"""
+    return f"{cents / CENTS_PER_UNIT:,.2f}"
+
+
+def amount_text(values):
+    """分 → '1234.56' 形式的文字（整列向量化处理，不逐行 format）；空值为 'nan'"""
+    cents = pd.Series(values).astype('Int64')
+    magnitude = cents.abs()
+    text = (
+        pd.Series(np.where((cents < 0).fillna(False), '-', ''), index=cents.index)
+        + (magnitude // CENTS_PER_UNIT).astype(str)
+        + '.'
+        + (magnitude % CENTS_PER_UNIT).astype(str).str.zfill(2)
+    )
+    return text.where(cents.notna(), 'nan')
@@ -0,0 +1,39 @@
+# 📁 modules/natural_sort.py
+# 支票号 / 发票号 自然排序键（加载数据时一次性向量化计算，保存为两列）：
+#   - XX排序前缀：号码开头的非数字部分（纯数字号码为空字符串，因此排在字母开头的号码之前）
+#   - XX排序数字：紧跟前缀的数字部分（float，没有数字时为 NaN，排在同前缀的最后）
+# 排序时使用 [前缀, 数字, 原始号码]：
+#   123 < 1000 < 1000A < EFT5 < EFT12 < PPA
+# 各页面直接 sort_values(natural_sort_columns('付款支票号'))，不再逐行 isnumeric() / int() 解析。
+import pandas as pd
+
+NATURAL_KEY_PATTERN = r'^(\D*)(\d+)?'
+
+# 需要自然排序的号码列（加载数据时为这些列添加排序键）
+NATURAL_SORT_COLUMNS = ['付款支票号', '发票号']
+
+
+def prefix_column(name):
+    return f'{name}排序前缀'
+
+
+def number_column(name):
+    return f'{name}排序数字'
+
+
+def natural_sort_columns(name):
+    """排序时使用的列：[前缀, 数字, 原始号码]"""
+    return [prefix_column(name), number_column(name), name]
+
+
+def add_natural_sort_keys(df, name):
+    """为 name 列添加 前缀 / 数字 两列排序键（在原 DataFrame 上添加并返回）"""
+    parts = df[name].astype(str).str.strip().str.extract(NATURAL_KEY_PATTERN)
+    df[prefix_column(name)] = parts[0].fillna('').astype(str)
+    df[number_column(name)] = pd.to_numeric(parts[1], errors='coerce').astype(float)
+    return df
+
+
+def natural_sorted(df, name):
+    """按 name 列的自然顺序稳定排序（df 中需要已有排序键两列）"""
+    return df.sort_values(natural_sort_columns(name), kind='stable')
@@ -0,0 +1,44 @@
+# 📁 modules/reconcile.py
+# 银行对账日期推导（各页面共用）
+# 规则：过账日期的“日” >= 截止日（默认 25 号）→ 归到下个月 1 号；否则 → 归到本月 1 号
+# 2024-03-15	15号 < 25号 → 本月对账	2024-03-01
+# 2024-03-25	25号 ≥ 25 → 下月对账	2024-04-01
+# 2024-12-30	30号 ≥ 25 → 跨年 → 次年1月	2025-01-01
+# 2024-06-01	1号 < 25 → 本月对账	2024-06-01
+import numpy as np
+import pandas as pd
+
+# 每月对账截止日
+RECONCILE_CUTOFF_DAY = 25
+
+
+def calculate_reconcile_date(posting_date: pd.Timestamp, cutoff_day: int = RECONCILE_CUTOFF_DAY) -> pd.Timestamp:
+    """单个日期版本（逐行使用），与 reconcile_month_start 结果一致"""
+    if pd.isna(posting_date):
+        return pd.NaT
+    if posting_date.day >= cutoff_day:
+        month = (posting_date.month % 12) + 1
+        year = posting_date.year if posting_date.month < 12 else posting_date.year + 1
+    else:
+        month = posting_date.month
+        year = posting_date.year
+    return pd.Timestamp(f"{year}-{month:02d}-01")
+
+
+def reconcile_month_start(dates, cutoff_day: int = RECONCILE_CUTOFF_DAY):
+    """
+    向量化版本：对整列日期一次性计算银行对账日期（NaT 保持为 NaT）
+    - 直接在 datetime64 数组上按月截断（datetime64[M]），不再逐行构造 Timestamp
+    - 传入 Series 时返回索引相同的 Series，否则返回 numpy datetime64[ns] 数组
+    """
+    index = dates.index if isinstance(dates, pd.Series) else None
+    values = np.asarray(pd.to_datetime(dates, errors='coerce'), dtype='datetime64[ns]')
+
+    months = values.astype('datetime64[M]')
+    # 当月第几天（1 起）；NaT 会得到一个极小的整数，不会触发“跨月”
+    day = (values - months.astype('datetime64[ns]')).astype('timedelta64[D]').astype(np.int64) + 1
+    result = np.where(day >= cutoff_day, months + 1, months).astype('datetime64[ns]')
+
+    if index is not None:
+        return pd.Series(result, index=index)
+    return result
@@ -0,0 +1,73 @@
+# 📁 modules/schema.py
+# 供应商数据的内存数据类型（schema）：
+#   - 部门 / 公司名称：category（取值重复度高，每个值只存一份，分组和比较都按整数编码进行）
+#   - 发票号 / 付款支票号：Arrow 字符串（连续内存，不再是一个个 Python str 对象）；
+#     缺失值仍按 NaN 处理（与原来 astype(str) 的结果一致，比较时得到 False 而不是 pd.NA）
+#   - 金额：Int64，单位为“分”（清洗时由元换算，见 modules/money.py）；日期：datetime64[ns]
+# 加载时统一转换并校验，同时报告内存占用。
+import numpy as np
+import pandas as pd
+
+
+def _id_string_dtype():
+    """Arrow 字符串类型（NaN 缺失值语义）；pyarrow 为可选依赖，未安装或 pandas 版本过旧时退回普通 object"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'object'
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        # pandas 2.2 及更早版本：同样语义的类型名为 string[pyarrow_numpy]
+        try:
+            return pd.StringDtype('pyarrow_numpy')
+        except (TypeError, ValueError):
+            return 'object'
+
+
+ID_STRING_DTYPE = _id_string_dtype()
+
+SUPPLIER_SCHEMA = {
+    '部门': 'category',
+    '公司名称': 'category',
+    '发票号': ID_STRING_DTYPE,
+    '付款支票号': ID_STRING_DTYPE,
+    '发票金额': 'Int64',
+    'TPS': 'Int64',
+    'TVQ': 'Int64',
+    '实际支付金额': 'Int64',
+    '付款支票总额': 'Int64',
+    '发票日期': 'datetime64[ns]',
+    '开支票日期': 'datetime64[ns]',
+    '银行对账日期': 'datetime64[ns]',
+}
+
+
+def apply_schema(df, schema):
+    """按 schema 转换列类型（不存在的列跳过）；日期中无法识别的值转为空值（金额在清洗时已换算为分）"""
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'float64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif str(dtype).startswith('datetime64'):
+            df[col] = pd.to_datetime(df[col], errors='coerce').astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def validate_schema(df, schema):
+    """返回不符合 schema 的问题列表（缺少的列、类型不一致的列），全部符合时返回空列表"""
+    problems = []
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            problems.append(f"缺少列：{col}")
+        elif str(df[col].dtype) != str(pd.api.types.pandas_dtype(dtype)):
+            problems.append(f"{col} 类型为 {df[col].dtype}，应为 {dtype}")
+    return problems
+
+
+def memory_footprint_mb(df):
+    """DataFrame 实际占用的内存（MB，包含字符串等对象的真实大小）"""
+    return round(float(df.memory_usage(deep=True).sum()) / 1024 ** 2, 2)
@@ -0,0 +1,153 @@
+# 📁 modules/snapshot_store.py
+# 本地快照存储：把清洗、类型转换后的 DataFrame 以 Feather（Arrow 列式）格式保存在本地，
+# 启动时通过内存映射（memory_map）直接读取，避免每次缓存失效都重新下载并解析整张 Google Sheet。
+# 数据源本身（远程 CSV / 本地文件 / SQLite）见 modules/data_sources.py
+import hashlib
+import json
+import os
+import urllib.error
+import urllib.request
+
+# 快照目录：固定放在 System/data_cache 下（相对于代码位置，而不是当前工作目录）
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_cache")
+
+# 远程请求超时时间（秒）
+FETCH_TIMEOUT = 30
+
+try:
+    # pyarrow 为可选依赖：未安装时不写快照，退回到每次完整解析
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+
+def _snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.feather")
+
+
+def _meta_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.meta.json")
+
+
+def read_meta(name):
+    """读取快照的元数据（ETag / Last-Modified / 内容哈希），不存在时返回空字典"""
+    try:
+        with open(_meta_path(name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def read_snapshot(name):
+    """以内存映射方式读取本地快照，快照不存在或损坏时返回 None"""
+    path = _snapshot_path(name)
+    if feather is None or not os.path.exists(path):
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+        return table.to_pandas()
+    except Exception as e:
+        print("[警告] 本地快照读取失败，将重新加载:", path, e)
+        return None
+
+
+def write_snapshot(name, df, meta):
+    """保存快照和元数据；先写临时文件再替换，避免多个用户同时加载时读到半个文件"""
+    if feather is None:
+        return
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = _snapshot_path(name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # 个别列类型无法写入 Arrow 时，只跳过快照，不影响正常加载
+        print("[警告] 本地快照写入失败:", path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+
+    write_meta(name, meta)
+
+
+def write_meta(name, meta):
+    """单独保存元数据（同样先写临时文件再替换）"""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp_path = f"{_meta_path(name)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, _meta_path(name))
+
+
+def fetch_if_changed(url, meta):
+    """
+    条件请求远程文件：
+    - 带上上次的 ETag / Last-Modified，服务器返回 304 时直接判定“未变化”
+    - 服务器不支持条件请求时，比较下载内容的 sha256，内容相同同样判定“未变化”
+    返回 (内容字节或 None, 新的元数据)，None 表示远程数据没有变化
+    """
+    request = urllib.request.Request(url)
+    if meta.get("etag"):
+        request.add_header("If-None-Match", meta["etag"])
+    if meta.get("last_modified"):
+        request.add_header("If-Modified-Since", meta["last_modified"])
+
+    try:
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            payload = response.read()
+            headers = response.headers
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None, meta
+        raise
+
+    new_meta = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+    }
+    if new_meta["sha256"] == meta.get("sha256"):
+        return None, new_meta
+    return payload, new_meta
+
+
+def load_with_snapshot(name, fetch, build_func, schema_version=None):
+    """
+    通用加载流程：数据源未变化 → 读本地快照；数据源有变化 → 清洗并刷新快照；
+    数据源不可用（断网 / 文件不存在）时，若本地已有快照则继续使用快照（离线可用）
+    fetch(元数据)：返回 (原始 DataFrame 或 None, 新的元数据)，None 表示数据没有变化
+    build_func(原始 DataFrame, 上一次快照或 None)：返回 (清洗后的 DataFrame, 需要额外记录的元数据字典)
+    schema_version：清洗规则的版本号；与快照中记录的不一致时（例如清洗时新增了派生列），旧快照作废并全量重建
+    """
+    snapshot = read_snapshot(name)
+    meta = read_meta(name) if snapshot is not None else {}
+    if meta.get("schema") != schema_version:
+        snapshot, meta = None, {}
+    # 没有可用快照时 meta 为空，不带任何条件，保证一定拿到完整内容
+
+    try:
+        raw, new_meta = fetch(meta)
+    except (urllib.error.URLError, OSError) as e:
+        if snapshot is not None:
+            print("[警告] 数据源获取失败，使用本地快照:", e)
+            return _with_version(snapshot, meta)
+        raise
+
+    if raw is None:
+        if any(meta.get(k) != v for k, v in new_meta.items()):
+            # 内容未变，仅更新 ETag 等信息，下次可直接走 304（保留上一次的导入报告等信息）
+            write_meta(name, {**meta, **new_meta})
+        return _with_version(snapshot, {**meta, **new_meta})
+
+    df, extra_meta = build_func(raw, snapshot)
+    new_meta.update(extra_meta)
+    new_meta["schema"] = schema_version
+    write_snapshot(name, df, new_meta)
+    return _with_version(df, new_meta)
+
+
+def _with_version(df, meta):
+    """把数据版本号写入 df.attrs['data_version']，供各页面的派生缓存作为缓存键"""
+    df.attrs['data_version'] = meta.get('version') or meta.get('sha256')
+    return df
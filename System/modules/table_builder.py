@@ -0,0 +1,55 @@
+# 📁 modules/table_builder.py
+# 带“小计 + 总计”的明细表格生成（各页面共用）
+# 原来的做法是在 groupby 循环里反复 pd.concat([final, ...])，每次都复制整张表，分组越多越慢（平方级）；
+# 这里一次性算出 明细行 / 各组小计行 / 总计行，再按分组键一次排序穿插到一起。
+# sorted_join：按分组把文字列排序后拼接（如 每个支票号的发票号列表），代替 groupby + lambda
+import pandas as pd
+
+# 行类型：同一分组内 明细行 在前，小计行 在后
+_DETAIL, _SUBTOTAL = 0, 1
+
+
+def build_subtotal_table(df, group_col, sum_cols, columns, sort_cols=None, fill=None,
+                         subtotal_label='{} 汇总', total_label='总计'):
+    """
+    生成“明细 + 分组小计 + 总计”表格（结果与原来的 groupby + concat 循环一致）
+    - group_col ：分组列（如 部门），小计行在该列写入 subtotal_label.format(分组值)，总计行写入 total_label
+    - sum_cols  ：需要求和的金额列
+    - columns   ：最终输出的列（顺序即输出顺序，需包含 group_col 和 sum_cols）
+    - sort_cols ：明细行的排序键（默认只按 group_col）；排序是稳定的，同一组内保持传入顺序
+    - fill      ：小计行 / 总计行中其他列的填充值，如 {'公司名称': '', '发票日期': pd.NaT}
+    """
+    sort_cols = sort_cols or [group_col]
+    fill = fill or {}
+
+    # 分组值为空的行不参与明细和小计（与 groupby 默认行为一致），但计入总计
+    grouped = df[df[group_col].notna()]
+    detail = grouped.dropna(subset=sort_cols)[columns]
+    detail = detail.sort_values(sort_cols, kind='stable')
+
+    # 标签列若是分类类型（category），先转成普通字符串列，才能写入“XX 汇总”“总计”等新标签
+    label_cols = [c for c in columns if c not in sum_cols]
+    detail = detail.astype({c: object for c in label_cols if isinstance(detail[c].dtype, pd.CategoricalDtype)})
+
+    subtotals = grouped.groupby(group_col, observed=True)[sum_cols].sum().reset_index()
+    subtotals['_分组键'] = subtotals[group_col].astype(object)
+    subtotals[group_col] = [subtotal_label.format(g) for g in subtotals['_分组键']]
+    subtotals['_行类型'] = _SUBTOTAL
+
+    detail = detail.assign(_分组键=detail[group_col].astype(object), _行类型=_DETAIL)
+
+    body = pd.concat([detail, subtotals.assign(**fill)], ignore_index=True)
+    body = body.sort_values(['_分组键', '_行类型'], kind='stable').drop(columns=['_分组键', '_行类型'])
+
+    total = df[sum_cols].sum().to_frame().T.assign(**{group_col: total_label}, **fill)
+    return pd.concat([body, total], ignore_index=True)[columns]
+
+
+def sorted_join(keys, values, sep):
+    """
+    按 keys 分组，把每组的 values（文字）排序后用 sep 拼接：
+    先对 (keys, values) 整体排序一次，再分组拼接，不再对每一组单独调用 lambda 排序
+    """
+    frame = pd.DataFrame({'键': keys.to_numpy(), '值': values.to_numpy()})
+    frame = frame.sort_values(['键', '值'], kind='stable')
+    return frame.groupby('键', sort=False)['值'].agg(sep.join)
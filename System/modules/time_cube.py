@@ -0,0 +1,101 @@
+# 📁 modules/time_cube.py
+# 时间分桶汇总表（cube）：按 (部门, 月份, 周) 预先汇总 实际支付金额 / 发票金额 / 未付金额（实际差额）
+#   - 月份键：年 * 12 + (月 - 1)；周键：该周周一距 1970-01-01 的天数（周一 ~ 周日，与 ISO 周一致）
+#     用整数键分组，不再对全表逐行生成 '2024-05'、'2024-05-06 ~ 2024-05-12' 这样的字符串
+#   - 每个数据版本（和日期口径）只计算一次；月度折线图、某个月的周度图都只对这张小表切片 / 汇总，
+#     显示用的 月份 / 周范围 文字只对汇总后的几十行生成
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.payment_rules import unpaid_amount
+
+MONTH_KEY_COL = '月份键'
+WEEK_KEY_COL = '周键'
+# 有付款金额（实际支付金额非空）的行数：用于排除“只有空付款金额”的分桶
+PAYMENT_COUNT_COL = '付款笔数'
+
+
+def month_keys(dates):
+    """日期 → 月份键（年 * 12 + 月 - 1）"""
+    return (dates.dt.year * 12 + dates.dt.month - 1).astype(np.int64)
+
+
+def week_keys(dates):
+    """日期 → 周键（所在周周一的天数编号）"""
+    days = dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    # 1970-01-01 是星期四：(days + 3) % 7 即星期几（周一 = 0）
+    return days - (days + 3) % 7
+
+
+def month_key_of(label):
+    """'2024-05' → 月份键"""
+    return int(label[:4]) * 12 + int(label[5:7]) - 1
+
+
+def month_labels(keys):
+    """月份键 → 'YYYY-MM' 文字"""
+    keys = pd.Series(keys)
+    return (keys // 12).astype(str) + '-' + (keys % 12 + 1).astype(str).str.zfill(2)
+
+
+def add_week_columns(df):
+    """按周键添加 周开始 / 周结束 / 周范围（'YYYY-MM-DD ~ YYYY-MM-DD'）三列"""
+    starts = pd.to_datetime(df[WEEK_KEY_COL].to_numpy(), unit='D').astype('datetime64[ns]')
+    ends = starts + pd.Timedelta(days=6)
+    return df.assign(
+        周开始=starts,
+        周结束=ends,
+        周范围=starts.strftime('%Y-%m-%d') + ' ~ ' + ends.strftime('%Y-%m-%d'),
+    )
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_time_cube(_df, version, date_col):
+    """
+    按 date_col（如 发票日期 / 开支票日期）分桶的汇总表，每行一个 (部门, 月份键, 周键)：
+    实际支付金额、发票金额、实际差额（分）以及 付款笔数；日期为空的行不计入。
+    部门为空的行也保留（部门为空），用于“所有部门”的合计
+    """
+    dates = pd.to_datetime(_df[date_col], errors='coerce')
+    valid = dates.notna()
+    df = _df.loc[valid]
+    dates = dates[valid]
+
+    frame = pd.DataFrame({
+        '部门': df['部门'],
+        MONTH_KEY_COL: month_keys(dates),
+        WEEK_KEY_COL: week_keys(dates),
+        '实际支付金额': df['实际支付金额'],
+        '发票金额': df['发票金额'],
+        '实际差额': unpaid_amount(df['发票金额'], df['实际支付金额']),
+        PAYMENT_COUNT_COL: df['实际支付金额'].notna().astype(np.int64),
+    })
+    return (
+        frame.groupby(['部门', MONTH_KEY_COL, WEEK_KEY_COL], observed=True, dropna=False)
+        .sum()
+        .reset_index()
+    )
+
+
+def cube_by_month(cube, value_cols, by_department=True):
+    """按 (部门, 月份) 或仅按月份汇总；by_department=True 时不含部门为空的行。带 月份 文字列"""
+    keys = ['部门', MONTH_KEY_COL] if by_department else [MONTH_KEY_COL]
+    out = cube.groupby(keys, observed=True)[value_cols].sum().reset_index()
+    out.insert(len(keys), '月份', month_labels(out[MONTH_KEY_COL]).to_numpy())
+    return out
+
+
+def cube_by_week(cube, value_cols, by_department=True):
+    """按 (部门, 周) 或仅按周汇总；带 周开始 / 周结束 / 周范围 三列"""
+    keys = ['部门', WEEK_KEY_COL] if by_department else [WEEK_KEY_COL]
+    out = cube.groupby(keys, observed=True)[value_cols].sum().reset_index()
+    return add_week_columns(out)
+
+
+def weeks_overlapping_month(cube, month_key):
+    """与某个月有交集的周（周开始或周结束落在该月）的周键"""
+    starts = pd.to_datetime(cube[WEEK_KEY_COL].to_numpy(), unit='D')
+    ends = starts + pd.Timedelta(days=6)
+    overlap = (month_keys(pd.Series(starts)) == month_key).to_numpy() | (month_keys(pd.Series(ends)) == month_key).to_numpy()
+    return np.unique(cube[WEEK_KEY_COL].to_numpy()[overlap])
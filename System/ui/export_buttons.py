@@ -0,0 +1,28 @@
+# 📁 ui/export_buttons.py
+# 下载按钮（各查询页面共用）：一个“下载”弹出框，内含 Excel / CSV / Parquet 三个按钮。
+# 按钮的 data 是函数，只有点击时才准备导出表并编码（编码结果按内容哈希缓存，见 modules/export_service.py）
+import streamlit as st
+
+from modules.export_service import EXPORT_FORMATS, export_bytes
+
+
+def render_export_buttons(frame, file_stem, key, label="📥 下载", sheet_name='Sheet1', money_columns=()):
+    """
+    - frame：要导出的 DataFrame，或返回 DataFrame 的函数（点击下载时才调用）
+    - file_stem：文件名（不含扩展名）
+    - key：页面内唯一的控件前缀
+    """
+    def payload(fmt):
+        df = frame() if callable(frame) else frame
+        return export_bytes(df, fmt, sheet_name=sheet_name, money_columns=money_columns)
+
+    with st.popover(label):
+        for fmt, (extension, mime) in EXPORT_FORMATS.items():
+            st.download_button(
+                label=f"{fmt} (.{extension})",
+                data=lambda fmt=fmt: payload(fmt),
+                file_name=f"{file_stem}.{extension}",
+                mime=mime,
+                key=f"{key}_{extension}",
+                on_click='ignore',
+            )
@@ -0,0 +1,24 @@
+# 📁 ui/page_registry.py
+# 页面注册表：侧边栏菜单项 → (页面模块, 入口函数名)
+# app.py 不再在启动时 import 全部页面模块（会连带加载 matplotlib / plotly / 字体等），
+# 只有用户选中某个页面时才 import 对应模块；import 过的模块由 Python 缓存，再次切换回来不会重复加载。
+import importlib
+
+PAGES = {
+    "应付未付账单查询(会计版)": ("modules.ap_unpaid_compta", "ap_unpaid_query_compta"),
+    "付款支票信息查询": ("modules.paid_cheques", "paid_cheques_query"),
+    "当前支票总账": ("modules.cheque_ledger_query", "cheque_ledger_query"),
+    "支票号查询": ("modules.cheque_lookup", "cheque_lookup_query"),
+    "发票号查询": ("modules.invoice_lookup", "invoice_lookup_query"),
+    "按公司查询": ("modules.company_invoice_query", "company_invoice_query"),
+    "查询Cash_Refund信息": ("modules.cash_refund", "cash_refund"),
+    # 删除 这个功能键，该功能转移至 gestionxy版本
+    # "应付未付账单查询(管理版)": ("modules.ap_unpaid", "ap_unpaid_query"),
+    # "进货明细统计": ...,
+}
+
+
+def load_page(name):
+    """按菜单项 import 页面模块，返回页面入口函数"""
+    module_name, func_name = PAGES[name]
+    return getattr(importlib.import_module(module_name), func_name)
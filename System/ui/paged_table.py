@@ -0,0 +1,84 @@
+# 📁 ui/paged_table.py
+# 分页表格（大表共用）：st.dataframe 会把整张表序列化后发送到浏览器，
+# 带 Styler 时还要为每个单元格生成格式化文字和 CSS，几万行的明细表是最慢的页面。
+# 这里改为在服务器端排序、分页，只把当前页的行（以及固定的总计行）发送到浏览器：
+#   - 排序：选择排序列和升序 / 降序，对整表排序后再取当前页；支票号 / 发票号按自然顺序（IN2 < IN10）
+#   - 分页：每页行数可选，页码超出范围时自动取最后一页
+#   - Styler 只在当前页行数不超过 STYLER_MAX_ROWS 时使用，否则退回普通表格（column_config 控制格式）
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.natural_sort import NATURAL_SORT_COLUMNS, add_natural_sort_keys, natural_sort_columns
+
+PAGE_SIZE_OPTIONS = [50, 100, 500, 1000]
+DEFAULT_PAGE_SIZE = 100
+# 当前页超过该行数时不再使用 Styler
+STYLER_MAX_ROWS = 500
+DEFAULT_ORDER = '（默认顺序）'
+
+
+def page_window(n_rows, page_size, page):
+    """返回 (起始行, 结束行, 实际页码, 总页数)；页码从 1 开始，超出范围时取最近的一页"""
+    n_pages = max(1, math.ceil(n_rows / page_size))
+    page = min(max(int(page), 1), n_pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, n_rows), page, n_pages
+
+
+def sort_frame(df, sort_col, descending=False):
+    """
+    按 sort_col 对整表稳定排序（空值在最后）。
+    支票号 / 发票号 按 [前缀, 数字, 原始号码] 自然排序：展示用的表已去掉排序键列，这里只为排序列临时计算
+    """
+    ascending = not descending
+    if sort_col not in NATURAL_SORT_COLUMNS:
+        return df.sort_values(sort_col, ascending=ascending, kind='stable', na_position='last')
+
+    keys = add_natural_sort_keys(pd.DataFrame({sort_col: df[sort_col].to_numpy()}), sort_col)
+    keys = keys.sort_values(natural_sort_columns(sort_col), ascending=ascending, kind='stable', na_position='last')
+    # 空号码与普通排序一样放在最后
+    order = keys.index.to_numpy()
+    missing = keys[sort_col].isna().to_numpy()
+    return df.iloc[np.concatenate([order[~missing], order[missing]])]
+
+
+def render_paged_table(df, key, prepare=None, style=None, footer=None, column_config=None,
+                       page_size=DEFAULT_PAGE_SIZE):
+    """
+    - df：完整的表（不含总计行）
+    - key：页面内唯一的控件前缀
+    - prepare：对当前页（含 footer）做显示前的转换，如 display_amounts（只处理当前页）
+    - style：接收当前页 DataFrame、返回 Styler 的函数；行数超过 STYLER_MAX_ROWS 时不使用
+    - footer：固定显示在每一页末尾的行（如 总计 行），不参与排序和分页
+    """
+    n_rows = len(df)
+    if n_rows > PAGE_SIZE_OPTIONS[0]:
+        col_sort, col_order, col_size, col_page = st.columns(4)
+        sort_col = col_sort.selectbox("排序列", [DEFAULT_ORDER] + list(df.columns), key=f"{key}_sort")
+        descending = col_order.selectbox("顺序", ["升序", "降序"], key=f"{key}_order") == "降序"
+        page_size = col_size.selectbox(
+            "每页行数", PAGE_SIZE_OPTIONS, index=PAGE_SIZE_OPTIONS.index(page_size), key=f"{key}_size"
+        )
+        page = col_page.number_input("页码", min_value=1, value=1, step=1, key=f"{key}_page")
+
+        if sort_col != DEFAULT_ORDER:
+            df = sort_frame(df, sort_col, descending)
+        start, end, page, n_pages = page_window(n_rows, page_size, page)
+        st.caption(f"第 {page} / {n_pages} 页，第 {start + 1} ~ {end} 行，共 {n_rows} 行")
+        window = df.iloc[start:end]
+    else:
+        window = df
+
+    use_style = style is not None and len(window) <= STYLER_MAX_ROWS
+    if footer is not None:
+        window = pd.concat([window, footer], ignore_index=True)
+    if prepare is not None:
+        window = prepare(window)
+
+    if use_style:
+        st.dataframe(style(window), use_container_width=True)
+    else:
+        st.dataframe(window, use_container_width=True, column_config=column_config)
@@ -1,4 +1,5 @@
 import streamlit as st
+from ui.page_registry import PAGES
 
 
 def render_sidebar():
@@ -8,18 +9,9 @@ def render_sidebar():
     
     # st.sidebar.radio()：在侧边栏添加一个单选按钮组
     menu = st.sidebar.radio("🚀数据更新截止至：2025-09-17 18:02", 
-        # 每个选项代表一个功能模块，可以根据选择执行不同的业务逻辑
+        # 每个选项代表一个功能模块（见 ui/page_registry.py），可以根据选择执行不同的业务逻辑
         #删除 这个功能键 "应付未付账单查询(管理版)", 该功能转移至 gestionxy版本
-        [
-        "应付未付账单查询(会计版)",
-        "付款支票信息查询",
-        "当前支票总账",
-        "支票号查询",
-        "发票号查询",
-        "按公司查询",
-        "查询Cash_Refund信息",
-        # "进货明细统计",
-    ])
+        list(PAGES))
     # # 返回用户选择的菜单项
     return menu
 
@@ -51,8 +43,8 @@ def get_selected_departments(df):
 
 
 # 在侧边栏创建一个手动刷新数据的按钮，并在用户点击按钮后清除缓存，重新加载数据
-# load_func： 一个数据加载函数，通常是**@st.cache_data** 缓存的数据函数
-def render_refresh_button(load_func):
+# load_funcs： 一个或多个数据加载函数，通常是**@st.cache_data** 缓存的数据函数
+def render_refresh_button(*load_funcs):
     # 在侧边栏显示数据刷新标题，###：设置三级标题（较大字体）
     st.sidebar.markdown("### 🔄 数据刷新")
     # st.sidebar.button()： 在侧边栏创建一个按钮。
@@ -67,7 +59,8 @@ def render_refresh_button(load_func):
             # 加载数据的复杂逻辑
         #return data
 
-        load_func.clear()
+        for load_func in load_funcs:
+            load_func.clear()
         
         # st.sidebar.success() 会在侧边栏显示绿色背景的消息框，增强用户反馈
         st.sidebar.success("✅ 已清除缓存，数据将重新加载")
@@ -79,4 +72,20 @@ def render_refresh_button(load_func):
 
     # 在Streamlit 中，很多组件（例如按钮、单选框、多选框）都是事件驱动的，
     # 即用户的点击、选择或输入会触发相应的状态改变。
-    # 这种状态变化通常需要通过布尔值进行判断，以确保正确地处理用户的交互行为
\ No newline at end of file
+    # 这种状态变化通常需要通过布尔值进行判断，以确保正确地处理用户的交互行为
+
+
+# 在侧边栏显示最近一次供应商数据导入的统计（新增 / 更新 / 未变化 行数）
+# report：modules.incremental_ingest 生成的统计字典，为空时不显示
+def render_ingest_report(report):
+    if not report:
+        return
+    st.sidebar.caption(
+        f"📥 最近一次数据导入（{report.get('模式', '')}）："
+        f"新增 {report.get('新增', 0)} 条，"
+        f"更新 {report.get('更新', 0)} 条，"
+        f"未变化 {report.get('未变化', 0)} 条"
+        + (f"，内存占用 {report['内存MB']} MB" if '内存MB' in report else "")
+    )
+    if report.get('类型问题'):
+        st.sidebar.warning("⚠️ 数据与 schema 不一致：\n" + "\n".join(f"- {p}" for p in report['类型问题']))
@@ -0,0 +1,50 @@
+# 📁 ui/table_style.py
+# 表格“小计 / 总计”行着色（各页面共用）
+# 原来每个页面都写一个 highlight_xxx(row)，再用 Styler.apply(axis=1) 逐行调用 Python 函数；
+# 这里改为 Styler.apply(axis=None)：对标签列做一次向量化判断，得到布尔掩码，再用 np.where 生成整张样式表。
+import numpy as np
+import pandas as pd
+
+
+def summary_row_styles(data, label_col, subtotal_color=None, total_color=None,
+                       total_label='总计', subtotal_suffix='汇总'):
+    """
+    生成与 data 同形状的 CSS 样式表：
+    - 标签列以 subtotal_suffix 结尾（如“蔬菜 汇总”）→ subtotal_color
+    - 标签列等于 total_label（如“总计”）→ total_color
+    - 空标签不着色
+    - 整列一次性做字符串判断（StringDtype 的向量化 str 方法），不逐行调用 Python 函数
+    """
+    if label_col in data.columns:
+        text = data[label_col].astype('string')
+    else:
+        text = pd.Series(pd.NA, index=data.index, dtype='string')
+
+    is_total = text.eq(total_label).fillna(False).to_numpy(dtype=bool)
+    is_subtotal = text.str.endswith(subtotal_suffix, na=False).to_numpy(dtype=bool)
+
+    row_css = np.full(len(data), '', dtype=object)
+    if total_color:
+        row_css = np.where(is_total, f'background-color: {total_color}', row_css)
+    if subtotal_color:
+        row_css = np.where(is_subtotal, f'background-color: {subtotal_color}', row_css)
+
+    return pd.DataFrame(
+        np.repeat(row_css[:, None], data.shape[1], axis=1),
+        index=data.index,
+        columns=data.columns,
+    )
+
+
+def highlight_summary_rows(df, label_col, subtotal_color=None, total_color=None,
+                           total_label='总计', subtotal_suffix='汇总'):
+    """返回已为小计/总计行着色的 Styler，调用方可以继续链式调用 .format(...)"""
+    return df.style.apply(
+        summary_row_styles,
+        axis=None,
+        label_col=label_col,
+        subtotal_color=subtotal_color,
+        total_color=total_color,
+        total_label=total_label,
+        subtotal_suffix=subtotal_suffix,
+    )